@@ -0,0 +1,303 @@
+'''
+Runs many engine matches concurrently in one process with asyncio.
+Pokerbot sockets and output pipes are non-blocking streams, so while one match waits on a bot
+the other matches keep dealing. Game rules, logging and records are shared with engine.py.
+'''
+import asyncio
+import argparse
+import socket
+import json
+import time
+import sys
+import os
+
+sys.path.append(os.getcwd())
+from config import *
+from engine import Game, Player, RoundState, TerminalState, CheckAction, FoldAction
+from protocol import HELLO, FRAME, encode_packet, decode_response
+from tournament import Result, bot_names, schedule, report, print_report
+
+
+class AsyncPlayer(Player):
+    '''
+    Handles subprocess and socket interactions with one player's pokerbot on the running event loop.
+    '''
+
+    def __init__(self, name, path, log_dir='.'):
+        super().__init__(name, path, log_dir)
+        self.reader = None
+        self.writer = None
+        self.drain_task = None
+
+    async def build(self):
+        '''
+        Loads the commands file and builds the pokerbot in a worker thread, so other matches keep dealing.
+        The build goes through Player.build, so BUILD_CACHE skips up to date builds and its lock keeps
+        concurrent matches from building the same bot at once.
+        '''
+        await asyncio.get_running_loop().run_in_executor(None, super().build)
+
+    async def start(self):
+        '''
+        Builds and runs the pokerbot.
+        '''
+        await self.build()
+        await self.run()
+
+    async def enqueue_output(self, out):
+        '''
+        Collects the pokerbot's output until it exits. The log takes any bytes, so output is read in chunks
+        rather than lines, and a line longer than the stream's buffer limit can't stop the drain.
+        '''
+        while True:
+            data = await out.read(65536)
+            if not data:
+                break
+            self.bot_log.write(data)
+
+    async def launch(self, address, pass_fds=()):
+        '''
+        Starts the pokerbot with the address of its engine connection as the last argument.
+        '''
+        proc = await asyncio.create_subprocess_exec(*self.commands['run'], address,
+                                                    stdout=asyncio.subprocess.PIPE,
+                                                    stderr=asyncio.subprocess.STDOUT,
+                                                    cwd=self.path, pass_fds=pass_fds)
+        self.bot_subprocess = proc
+        self.drain_task = asyncio.ensure_future(self.enqueue_output(proc.stdout))
+
+    async def run(self):
+        '''
+        Runs the pokerbot and establishes the socket connection over the transport it supports.
+        '''
+        if self.commands is not None and len(self.commands['run']) > 0:
+            transport = self.transport()
+            connection = asyncio.get_running_loop().create_future()
+
+            def accept(reader, writer):
+                if not connection.done():
+                    connection.set_result((reader, writer))
+
+            try:
+                if transport == 'socketpair':
+                    engine_socket, bot_socket = socket.socketpair()
+                    with bot_socket:
+                        await self.launch('fd:' + str(bot_socket.fileno()), (bot_socket.fileno(),))
+                    reader, writer = await asyncio.open_connection(sock=engine_socket)
+                    # there is no connection to wait for, so the pokerbot acks once it is ready
+                    if (await asyncio.wait_for(reader.readline(), CONNECT_TIMEOUT)).strip() != b'K':
+                        writer.close()
+                        raise ConnectionError
+                    self.reader, self.writer = reader, writer
+                else:
+                    server_socket, address = self.listen(transport)
+                    try:
+                        # asyncio sets TCP_NODELAY on accepted TCP connections itself
+                        server = await asyncio.start_server(accept, sock=server_socket)
+                        async with server:
+                            await self.launch(address)
+                            # wait until we timeout or the player connects
+                            self.reader, self.writer = await asyncio.wait_for(connection, CONNECT_TIMEOUT)
+                    finally:
+                        self.unlisten(address)
+                await self.negotiate()
+                print(self.name, 'connected successfully over', transport, 'in binary' if self.binary else 'in text')
+            except (TypeError, ValueError):
+                print(self.name, 'run command misformatted')
+            except asyncio.TimeoutError:
+                print('Timed out waiting for', self.name, 'to connect')
+            except OSError:
+                print(self.name, 'run failed - check "run" in commands.json')
+
+    async def stop(self):
+        '''
+        Closes the socket connection and stops the pokerbot.
+        '''
+        if self.writer is not None:
+            try:
+                self.writer.write(encode_packet(['Q']) if self.binary else b'Q\n')
+                await self.writer.drain()
+                self.writer.close()
+            except OSError:
+                print('Could not close socket connection with', self.name)
+        if self.bot_subprocess is not None:
+            try:
+                await asyncio.wait_for(self.bot_subprocess.wait(), CONNECT_TIMEOUT)
+            except asyncio.TimeoutError:
+                print('Timed out waiting for', self.name, 'to quit')
+                self.bot_subprocess.kill()
+                await self.bot_subprocess.wait()
+            await self.drain_task
+        self.write_log()
+
+    def connected(self):
+        '''
+        Returns whether the pokerbot can be queried.
+        '''
+        return self.writer is not None
+
+    async def request(self, packet):
+        '''
+        Sends one message to the pokerbot and returns its response clause.
+        '''
+        self.writer.write(encode_packet(packet) if self.binary else (' '.join(packet) + '\n').encode())
+        await self.writer.drain()
+        try:
+            if self.binary:
+                return decode_response(await asyncio.wait_for(self.read_frame(), CONNECT_TIMEOUT))
+            line = await asyncio.wait_for(self.reader.readline(), CONNECT_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise socket.timeout
+        except asyncio.IncompleteReadError:
+            raise ConnectionError('connection closed')
+        return line.decode().strip()
+
+    async def read_frame(self):
+        '''
+        Reads one wire protocol v2 frame's payload.
+        '''
+        length, = FRAME.unpack(await self.reader.readexactly(FRAME.size))
+        return await self.reader.readexactly(length)
+
+    async def negotiate(self):
+        '''
+        Offers the pokerbot wire protocol v2 if WIRE_PROTOCOL is 'binary'.
+        '''
+        if WIRE_PROTOCOL == 'binary':
+            self.binary = await self.request([HELLO]) == HELLO
+
+    async def query(self, round_state, player_message, game_log):
+        '''
+        Requests one action from the pokerbot, waiting on the event loop instead of blocking.
+        At the end of the round, we request a CheckAction from the pokerbot.
+        '''
+        legal_actions = round_state.legal_actions() if isinstance(round_state, RoundState) else {CheckAction}
+        self.latency = None  # unless the pokerbot is asked, there is no round trip to record
+        if self.connected() and self.game_clock > 0.:
+            clause = ''
+            try:
+                packet = self.packet(player_message)
+                start_time = time.perf_counter()
+                clause = await self.request(packet)
+                action = self.decode(clause, time.perf_counter() - start_time, round_state, legal_actions, game_log)
+                if action is not None:
+                    return action
+            except (OSError, IndexError, KeyError, ValueError) as error:
+                self.fail(error, clause, game_log)
+        return CheckAction() if CheckAction in legal_actions else FoldAction()
+
+
+class AsyncGame(Game):
+    '''
+    A Game whose rounds are coroutines, so several can share one event loop.
+    Pokerbots always run as subprocesses; headless bots would block the loop.
+    '''
+
+    async def run_round(self, players):
+        '''
+        Runs one round of poker.
+        '''
+        round_state = self.deal_round()
+        actions = []
+        while not isinstance(round_state, TerminalState):
+            self.log_round_state(players, round_state)
+            active = round_state.button % 2
+            player = players[active]
+            action = await player.query(round_state, self.player_messages[active], self.log)
+            round_state = self.apply_action(player, round_state, action, actions)
+        self.finish_round(players, round_state, actions)
+        for player, player_message, delta in zip(players, self.player_messages, round_state.deltas):
+            await player.query(round_state, player_message, self.log)
+            self.settle(player, delta)
+
+    async def run(self):
+        '''
+        Runs one game of poker and returns the players' final bankrolls.
+        '''
+        players = [AsyncPlayer(name, path, self.log_dir) for name, path in zip(self.names, self.paths)]
+        self.open_records(players)
+        await asyncio.gather(*[player.start() for player in players])
+        self.start_rounds()
+        for round_num in range(1, self.num_rounds + 1):
+            self.start_round(round_num, players)
+            bankroll = self.entrants[self.test_entrant].bankroll
+            await self.run_round(players)
+            players = players[::-1]
+            if self.test_decided(bankroll):
+                break
+        self.end_rounds(players)
+        for player in players:
+            await player.stop()
+        self.close_records()
+        return [player.bankroll for player in self.entrants]
+
+
+async def play(match, limit):
+    '''
+    Plays one match once a slot under limit is free.
+    '''
+    async with limit:
+        os.makedirs(match.log_dir, exist_ok=True)
+        game = AsyncGame(match.names, match.paths, match.num_rounds, match.log_dir, False, match.log_level,
+                         seed=match.seed)
+        return Result(match, await game.run())
+
+
+async def play_all(matches, concurrency):
+    '''
+    Plays every match, at most concurrency at a time, and returns the results in the order they finish.
+    '''
+    limit = asyncio.Semaphore(concurrency)
+    results = []
+    for result in asyncio.as_completed([play(match, limit) for match in matches]):
+        result = await result
+        results.append(result)
+        print('[{}/{}] {}: {}'.format(len(results), len(matches), result.match.match_id, result.bankrolls))
+    return results
+
+
+def parse_args():
+    '''
+    Parses the scheduler's command line arguments.
+    '''
+    parser = argparse.ArgumentParser(prog='python3 async_engine.py')
+    parser.add_argument('paths', nargs='+', help='Pokerbot directories, each containing a commands.json')
+    parser.add_argument('--mode', choices=['round-robin', 'head-to-head'], default='round-robin',
+                        help='Pair every bot with every other, or the first bot with each of the others')
+    parser.add_argument('--games', type=int, default=2, help='Matches per pairing, defaults to 2')
+    parser.add_argument('--rounds', type=int, default=NUM_ROUNDS, help='Rounds per match, defaults to NUM_ROUNDS')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the first match, defaults to 0')
+    parser.add_argument('--duplicate', action='store_true',
+                        help='Replay every deal with the seats exchanged and report the paired scores')
+    parser.add_argument('--concurrency', type=int, default=16, help='Matches to play at once, defaults to 16')
+    parser.add_argument('--log-dir', type=str, default='tournament', help='Directory for match logs and the report')
+    parser.add_argument('--log-level', choices=['off', 'summary', 'full'], default=GAME_LOG_LEVEL,
+                        help='How much of each match to write to its game log, defaults to GAME_LOG_LEVEL')
+    return parser.parse_args()
+
+
+def main():
+    '''
+    Schedules the matches, plays them concurrently on one event loop and prints the merged report.
+    Each match deals from its own seeded stream, so interleaving them doesn't change the cards.
+    '''
+    args = parse_args()
+    if len(args.paths) < 2:
+        print('A tournament needs at least two bots')
+        return
+    matches = schedule(args.paths, args.mode, args.games, args.seed, args.rounds, args.log_dir, False, args.log_level,
+                       args.duplicate)
+    print('Playing', len(matches), 'matches,', args.concurrency, 'at a time')
+    results = asyncio.run(play_all(matches, args.concurrency))
+    summary = report(bot_names(args.paths), results)
+    print()
+    print_report(summary)
+    name = os.path.join(args.log_dir, 'report.json')
+    with open(name, 'w') as report_file:
+        json.dump(summary, report_file, indent=4)
+    print()
+    print('Writing', name)
+
+
+if __name__ == '__main__':
+    main()
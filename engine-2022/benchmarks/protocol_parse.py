@@ -0,0 +1,84 @@
+'''
+Measures how fast each wire protocol encodes and parses the engine's messages.
+The messages are recorded from a headless game between two Python skeleton bots, then encoded by the engine's
+side and parsed by the Python skeleton runner's side of each protocol, without any socket in between.
+Run from the engine directory: python3 benchmarks/protocol_parse.py
+'''
+import argparse
+import contextlib
+import tempfile
+import timeit
+import sys
+import os
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SKELETON_DIR = os.path.join(ENGINE_DIR, 'python_skeleton')
+
+
+def record_messages(engine, rounds):
+    '''
+    Plays a headless game and returns every message the engine sent, with its game clock stamped on,
+    and the response clause to each.
+    '''
+    messages = []
+    responses = []
+    request = engine.InProcessPlayer.request
+
+    def recording_request(player, packet):
+        messages.append(list(packet))
+        responses.append(request(player, packet))
+        return responses[-1]
+
+    engine.InProcessPlayer.request = recording_request
+    try:
+        with tempfile.TemporaryDirectory() as log_dir, open(os.devnull, 'w') as devnull:
+            with contextlib.redirect_stdout(devnull):
+                engine.Game(('A', 'B'), (SKELETON_DIR, SKELETON_DIR), num_rounds=rounds, log_dir=log_dir,
+                            headless=True, log_level='off', seed=0).run()
+    finally:
+        engine.InProcessPlayer.request = request
+    return messages, responses
+
+
+def main():
+    '''
+    Prints the encode and parse rate of each protocol and its size on the wire.
+    '''
+    parser = argparse.ArgumentParser(prog='python3 benchmarks/protocol_parse.py')
+    parser.add_argument('--rounds', type=int, default=200, help='Rounds of messages to record')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed passes over the messages, the best is kept')
+    args = parser.parse_args()
+    os.chdir(ENGINE_DIR)
+    sys.path.insert(0, ENGINE_DIR)
+    import engine
+    import protocol
+    sys.path.insert(0, SKELETON_DIR)
+    from skeleton.runner import decode_packet, encode_response
+    messages, responses = record_messages(engine, args.rounds)
+    header = protocol.FRAME.size
+    text = [(' '.join(packet) + '\n').encode() for packet in messages]
+    binary = [protocol.encode_packet(packet) for packet in messages]
+    text_responses = [(code + '\n').encode() for code in responses]
+    binary_responses = [encode_response(code) for code in responses]
+    cases = [
+        ('text', 'engine encode', lambda: [(' '.join(packet) + '\n').encode() for packet in messages]),
+        ('text', 'bot parse', lambda: [data.decode().strip().split(' ') for data in text]),
+        ('text', 'engine parse', lambda: [data.decode().strip() for data in text_responses]),
+        ('binary', 'engine encode', lambda: [protocol.encode_packet(packet) for packet in messages]),
+        ('binary', 'bot parse', lambda: [decode_packet(data[header:]) for data in binary]),
+        ('binary', 'engine parse', lambda: [protocol.decode_response(data[header:]) for data in binary_responses]),
+    ]
+    print('{} messages from {} rounds'.format(len(messages), args.rounds))
+    print('{:<10}{:>14}{:>16}'.format('protocol', 'message bytes', 'response bytes'))
+    for name, frames, response_frames in [('text', text, text_responses), ('binary', binary, binary_responses)]:
+        print('{:<10}{:>14.1f}{:>16.1f}'.format(name, sum(map(len, frames)) / len(frames),
+                                               sum(map(len, response_frames)) / len(response_frames)))
+    print()
+    print('{:<10}{:<16}{:>14}{:>12}'.format('protocol', 'step', 'messages / s', 'us each'))
+    for name, step, run in cases:
+        best = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        print('{:<10}{:<16}{:>14.0f}{:>12.2f}'.format(name, step, len(messages) / best, 1e6 * best / len(messages)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+'''
+Measures the round trip time of one engine message over each TRANSPORT.
+The engine side is engine.Player and the bot side is the Python skeleton's connect, so both ends run the same code
+as a real match; the bot only answers every message with a check, leaving the transport as the cost.
+Run from the engine directory: python3 benchmarks/transport_rtt.py
+'''
+import argparse
+import statistics
+import tempfile
+import time
+import sys
+import os
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SKELETON_DIR = os.path.join(ENGINE_DIR, 'python_skeleton')
+TRANSPORTS = ['tcp', 'unix', 'socketpair']
+PACKET = ['T29.817', 'P1', 'H7c,Ks', 'B9d,2h,Jc', 'O']  # a typical flop message with its game clock
+DECISIONS_PER_ROUND = 10
+
+
+def echo(address):
+    '''
+    The bot side: connects like a skeleton bot and checks back every message until the engine quits.
+    '''
+    sys.path.insert(0, SKELETON_DIR)
+    from skeleton.runner import connect
+    sock = connect(argparse.Namespace(host='localhost', port=address))
+    socketfile = sock.makefile('rw')
+    if address.startswith('fd:'):
+        socketfile.write('K\n')
+        socketfile.flush()
+    for line in socketfile:
+        if line.startswith('Q'):
+            break
+        socketfile.write('K\n')
+        socketfile.flush()
+    socketfile.close()
+    sock.close()
+
+
+def measure(engine, transport, messages, warmup):
+    '''
+    Starts an echo bot over transport and returns the round trip time of each message in seconds.
+    '''
+    engine.TRANSPORT = transport
+    with tempfile.TemporaryDirectory() as log_dir:
+        player = engine.Player(transport, SKELETON_DIR, log_dir)
+        player.commands = {'build': [], 'run': [sys.executable, os.path.abspath(__file__), '--echo'],
+                           'transports': TRANSPORTS}
+        player.run()
+        if not player.connected():
+            return []
+        for _ in range(warmup):
+            player.request(PACKET)
+        times = []
+        for _ in range(messages):
+            start_time = time.perf_counter()
+            player.request(PACKET)
+            times.append(time.perf_counter() - start_time)
+        player.stop()
+    return times
+
+
+def main():
+    '''
+    Prints the round trip time statistics for each transport.
+    '''
+    parser = argparse.ArgumentParser(prog='python3 benchmarks/transport_rtt.py')
+    parser.add_argument('--messages', type=int, default=20000, help='Timed round trips per transport')
+    parser.add_argument('--warmup', type=int, default=1000, help='Untimed round trips before timing')
+    parser.add_argument('--echo', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('address', nargs='?', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.echo:
+        echo(args.address)
+        return
+    os.chdir(ENGINE_DIR)
+    sys.path.insert(0, ENGINE_DIR)
+    import engine
+    print('{:<12}{:>10}{:>10}{:>10}{:>18}'.format('transport', 'mean us', 'p50 us', 'p99 us', 'ms / 1000 rounds'))
+    for transport in TRANSPORTS:
+        times = measure(engine, transport, args.messages, args.warmup)
+        if not times:
+            print('{:<12}{:>10}'.format(transport, 'failed'))
+            continue
+        times.sort()
+        mean = statistics.mean(times)
+        print('{:<12}{:>10.1f}{:>10.1f}{:>10.1f}{:>18.1f}'.format(
+            transport, 1e6 * mean, 1e6 * times[len(times) // 2], 1e6 * times[int(0.99 * len(times))],
+            1e3 * mean * DECISIONS_PER_ROUND * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,13 +2,22 @@
 Simple example pokerbot, written in Python.
 '''
 import random
-import pandas as pd
+import os
+import numpy as np
 from skeleton.actions import FoldAction, CallAction, CheckAction, RaiseAction
 from skeleton.states import GameState, TerminalState, RoundState
-from skeleton.states import NUM_ROUNDS, STARTING_STACK, BIG_BLIND, SMALL_BLIND
+from skeleton.states import NUM_ROUNDS, STARTING_STACK, BIG_BLIND, SMALL_BLIND, FLOP_PERCENT, TURN_PERCENT
 from skeleton.bot import Bot
 from skeleton.runner import parse_args, run_bot
 from support import *
+from equity import time_budget
+from ranges import class_names
+from tracker import RangeTracker
+from tables import Table
+from opponent import OpponentStats
+
+MIN_BETS_FACED = 20 # bets the opp must have faced on a street before we trust how often they fold to them
+STARTING_STRENGTHS = Table(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'swap_strengths.bin')) # hole strengths, memory-mapped on first use and kept for the life of the process
 
 
 class Player(Bot):
@@ -26,14 +35,15 @@ class Player(Bot):
         Returns:
         Nothing.
         '''
-        self.opp_range = []
-        self.opp_range_mapping = {} # mapping opp_range to expected win rate
-
+        self.starting_strengths = STARTING_STRENGTHS.column('Strengths') #the values we computed offline with hole card swaps, one per hole class
+        preflop_strengths = self.starting_strengths[[STARTING_STRENGTHS.index(name) for name in class_names()]] # the same strengths, one per possible opp hand
+        self.opp_range = RangeTracker(preflop_strengths) # weights over all 1326 hands the opp could have, reset every round
+        self.call_odds = None # pot odds the opp faced after our last raise, until we see whether they called
+        self.opp_stats = OpponentStats() # how the opp has played this game, updated after every round
 
-        calculated_df = pd.read_csv('hole_strengths.csv') #the values we computed offline, this df is slow to search through though
-        holes = calculated_df.Holes #the columns of our spreadsheet
-        strengths = calculated_df.Strengths
-        self.starting_strengths = dict(zip(holes, strengths)) #convert to a dictionary, O(1) lookup time!
+        self.equity_cache_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'equity_cache.pkl') # equity estimates persist next to this file between games, None keeps them in memory only
+        if self.equity_cache_file is not None:
+            keep_equity_cache(self.equity_cache_file)
 
 
     def handle_new_round(self, game_state, round_state, active):
@@ -54,6 +64,9 @@ class Player(Bot):
         my_cards = round_state.hands[active]  # your cards
         big_blind = bool(active)  # True if you are the big blind
 
+        self.opp_range.reset(my_cards) # the opp could have any hand we can't see
+        self.call_odds = None
+
 
     def handle_round_over(self, game_state, terminal_state, active):
         '''
@@ -73,6 +86,8 @@ class Player(Bot):
         my_cards = previous_state.hands[active]  # your cards
         opp_cards = previous_state.hands[1-active]  # opponent's cards or [] if not revealed
 
+        self.opp_stats.observe(terminal_state, active) # one pass over this round's actions
+
     
     def get_bet_size(self,strength_against_range,street,big_blind,pot_total,continue_cost,my_pip):
 
@@ -93,6 +108,27 @@ class Player(Bot):
 
         return raise_amount
 
+    def update_opp_range(self, street, board_cards, my_cards, active, continue_cost, pot_total, opp_pip):
+        '''
+        Reweights the opp's range by everything they did since our last action.
+        '''
+        if street != self.opp_range.street: # new board cards
+            if self.call_odds is not None: # the street only ends after our raise if they called it
+                self.opp_range.observe_call(self.call_odds)
+            swaps = [percent for swap_street, percent in ((0, FLOP_PERCENT), (3, TURN_PERCENT)) if self.opp_range.street <= swap_street < street]
+            self.opp_range.advance(street, board_cards, swaps) # their cards may have been swapped, then every hand is rescored on the new board
+        self.call_odds = None
+
+        # clearing out hands that hold our cards (they change when swapped) or the board, one mask test per hand
+        self.opp_range.remove_cards(list(my_cards) + list(board_cards))
+
+        if continue_cost > 0 and not (street == 0 and opp_pip == BIG_BLIND): # they bet or raised, the blinds don't count
+            self.opp_range.observe_bet(continue_cost / pot_total)
+        elif continue_cost == 0 and street >= 3 and not bool(active): # the big blind acts first after the flop, so they checked
+            self.opp_range.observe_check()
+        elif continue_cost == 0 and street == 0: # they limped in from the small blind
+            self.opp_range.observe_call((BIG_BLIND - SMALL_BLIND) / (2 * BIG_BLIND))
+
     def get_action(self, game_state, round_state, active):
         '''
         Where the magic happens - your code should implement this function.
@@ -117,6 +153,7 @@ class Player(Bot):
         continue_cost = opp_pip - my_pip  # the number of chips needed to stay in the pot
         my_contribution = STARTING_STACK - my_stack  # the number of chips you have contributed to the pot
         opp_contribution = STARTING_STACK - opp_stack  # the number of chips your opponent has contributed to the pot
+        opp_fold_to_bet = self.opp_stats.fold_to_bet(street, MIN_BETS_FACED)  # share of bets the opp folded to on this street, None until they faced enough
 
 
         if (my_stack-opp_stack)/2 > (NUM_ROUNDS-game_state.round_num): # we've already won
@@ -126,6 +163,8 @@ class Player(Bot):
         my_action = None
         min_raise, max_raise = round_state.raise_bounds()
         pot_total = my_contribution + opp_contribution # total in pot
+        rounds_left = NUM_ROUNDS - game_state.round_num + 1
+        budget = time_budget(game_state.game_clock, rounds_left, street, pot_total) # seconds we can afford to spend on this decision, more when the pot is big
 
         if (CallAction in legal_actions and (continue_cost <= my_stack)): #only consider raising if the hand we have is strong
             temp_action = CallAction()
@@ -135,46 +174,16 @@ class Player(Bot):
             temp_action = FoldAction()
 
 
-        _MONTE_CARLO_ITERS= 20
-        
-        # calculating the strength of the current expected opp_range
-        opp_range = self.opp_range.copy()
-        for potential_opp_hand in opp_range:
-            alreadyTaken = False
-
-            for card in board_cards:
-                if card in potential_opp_hand:
-                    alreadyTaken = True
-                
-            if not alreadyTaken:
-                self.opp_range_mapping[tuple(potential_opp_hand)] = calc_strength(potential_opp_hand, _MONTE_CARLO_ITERS, community = board_cards)
-            else: # cleared out of the range
-                self.opp_range.remove(potential_opp_hand)
-                if tuple(potential_opp_hand) in self.opp_range_mapping.keys():
-                    del self.opp_range_mapping[tuple(potential_opp_hand)]
-
-        
+        # updating estimate of opponent's range, down weighting the hands that wouldn't have played this way
+        self.update_opp_range(street, board_cards, my_cards, active, continue_cost, pot_total, opp_pip)
 
         
         if continue_cost > 0:
 
-            opp_bet_ratio = continue_cost / pot_total
             pot_odds = continue_cost / (pot_total + continue_cost) # calculating pot odds of staying continuation cost
             
-            # updating estimate of opponent's range
-            current_range_in_mapping = list(self.opp_range_mapping.keys())
-            for potential_opp_hand_tuple in current_range_in_mapping:
-
-                potential_opp_hand = list(potential_opp_hand_tuple) # converting the key from tuple to list
-
-                if self.opp_range_mapping[potential_opp_hand_tuple] <= get_mean_strength_from_range(self.opp_range_mapping) + 0.5*get_std_of_range_strengths(self.opp_range_mapping):
-                    if potential_opp_hand in self.opp_range:
-                        self.opp_range.remove(potential_opp_hand)
-                        del self.opp_range_mapping[potential_opp_hand_tuple]
-
-            
             # getting our strength against expected opp_range
-            strength_against_range = calc_strength_against_range(my_cards, 1, community = board_cards, opp_range = self.opp_range)
+            strength_against_range = estimate_strength_against_range(my_cards, budget, community = board_cards, opp_range = self.opp_range.range).strength
 
 
             if strength_against_range >= pot_odds:
@@ -201,21 +210,11 @@ class Player(Bot):
 
         else: # continuation cost is 0
 
-            if bool(active) and street >= 3: # we're big blind so opp checked
-                # updating estimate of opponent's range, assuming weakness
-                current_range_in_mapping = list(self.opp_range_mapping.keys())
-                for potential_opp_hand_tuple in current_range_in_mapping:
-
-                    potential_opp_hand = list(potential_opp_hand_tuple) # converting the key from tuple to list
-
-                    if self.opp_range_mapping[potential_opp_hand_tuple] >= get_mean_strength_from_range(self.opp_range_mapping) - 0.5*get_std_of_range_strengths(self.opp_range_mapping):
-                        if potential_opp_hand in self.opp_range:
-                            self.opp_range.remove(potential_opp_hand)
-                            del self.opp_range_mapping[potential_opp_hand_tuple]
-                
-
-            strength_against_range = calc_strength_against_range(my_cards, 1, community = board_cards,opp_range=self.opp_range)
-            if random.random() < strength_against_range:
+            strength_against_range = estimate_strength_against_range(my_cards, budget, community = board_cards,opp_range=self.opp_range.range).strength
+            bet_chance = strength_against_range
+            if opp_fold_to_bet is not None: # a bet also wins whenever they fold to it, so we bet weaker hands as often as they fold
+                bet_chance += (1 - bet_chance) * opp_fold_to_bet
+            if random.random() < bet_chance:
                 raise_amount = self.get_bet_size(strength_against_range,street,active,pot_total,continue_cost,my_pip)
 
                 raise_cost = raise_amount - my_pip # how much it costs to make said raise
@@ -229,6 +228,10 @@ class Player(Bot):
                 my_action = CheckAction()
 
 
+        if isinstance(my_action, RaiseAction): # remembering the odds they face, a call tells us about their hand
+            opp_cost = my_action.amount - opp_pip
+            self.call_odds = opp_cost / (pot_total + (my_action.amount - my_pip) + opp_cost)
+
         return my_action
             
 
@@ -0,0 +1,92 @@
+'''
+A bounded cache of equity estimates, keyed by suit isomorphism class so equivalent spots share entries.
+'''
+from collections import OrderedDict
+import pickle
+import fcntl
+import os
+
+
+class EquityCache():
+    '''
+    A least recently used map from canonical keys to (strength, samples) estimates.
+    strength can also be an array of strengths all from the same number of samples, merged element by element.
+    Estimates for the same key are merged, so repeated spots keep getting more precise.
+    meta records what the estimates depend on besides their keys, such as the hole card swap percentages.
+    It is saved with the estimates and a file saved with different meta is not loaded.
+    '''
+
+    def __init__(self, maxsize=200000, meta=None):
+        self.maxsize = maxsize
+        self.meta = meta or {}
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, samples=1):
+        '''
+        Returns the cached (strength, samples) if it was estimated from at least samples runouts, otherwise None.
+        '''
+        entry = self.entries.get(key)
+        if entry is None or entry[1] < samples:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, strength, samples):
+        '''
+        Merges a new estimate into the cache and returns the merged (strength, samples).
+        '''
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            strength = (entry[0] * entry[1] + strength * samples) / (entry[1] + samples)
+            samples += entry[1]
+        self.entries[key] = (strength, samples)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return strength, samples
+
+    def load(self, path):
+        '''
+        Merges the estimates saved at path into the cache. A missing or unreadable file is ignored,
+        and so is one saved with different meta, since its estimates are for a different game.
+        '''
+        for key, (strength, samples) in self.read(path).items():
+            self.put(key, strength, samples)
+
+    def read(self, path):
+        '''
+        Returns the estimates saved at path with the same meta, or an empty dict.
+        '''
+        try:
+            with open(path, 'rb') as cache_file:
+                saved = pickle.load(cache_file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return {}
+        if not isinstance(saved, dict) or saved.get('meta') != self.meta:
+            return {}
+        return saved['entries']
+
+    def save(self, path):
+        '''
+        Writes the cached estimates and their meta to path, keeping whatever other processes saved there meanwhile.
+        Under a lock on path + '.lock', each key keeps the estimate from more samples, ours or the saved one,
+        so estimates are never counted twice, and the file is replaced atomically, so readers never see it half written.
+        '''
+        with open(path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            entries = OrderedDict(self.read(path))
+            for key, entry in self.entries.items():
+                saved = entries.pop(key, None)
+                entries[key] = entry if saved is None or entry[1] >= saved[1] else saved
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+            temp_path = path + '.tmp'
+            with open(temp_path, 'wb') as cache_file:
+                pickle.dump({'meta': self.meta, 'entries': dict(entries)}, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
@@ -0,0 +1,54 @@
+'''
+Integer encoding of cards, shared by the equity and range code.
+A card is 4 * rank + suit, with ranks 2 through A as 0 through 12 and suits c, d, h, s as 0 through 3,
+which is the same order eval7.Deck() lists its cards in.
+'''
+
+RANKS = '23456789TJQKA'
+SUITS = 'cdhs'
+CARDS = [rank + suit for rank in RANKS for suit in SUITS]
+CARD_INDEX = {card: index for index, card in enumerate(CARDS)}
+
+
+def encode(cards):
+    '''
+    Converts card strings (or eval7 Cards) to a list of card indices.
+    '''
+    return [CARD_INDEX[str(card)] for card in cards]
+
+
+def decode(indices):
+    '''
+    Converts card indices back to card strings.
+    '''
+    return [CARDS[index] for index in indices]
+
+
+def canonical(*groups):
+    '''
+    Returns a key shared by every way of relabelling suits in the given groups of cards
+    (for example our hole cards, then the board). Cards within a group are unordered.
+    Each suit is described by the ranks it holds in every group; relabelling suits only reorders
+    those descriptions, so sorting them gives the same key for exactly the equivalent spots.
+    '''
+    return canonical_suits(*groups)[0]
+
+
+def canonical_suits(*groups):
+    '''
+    Returns the canonical key of the groups and the suit each actual suit takes in it, as a list indexed by suit.
+    Relabelling cards by that list maps every spot with the same key onto the same cards.
+    Suits with the same description are interchangeable, so how ties are broken doesn't matter.
+    '''
+    signatures = [[], [], [], []]
+    for group in groups:
+        ranks = [[], [], [], []]
+        for card in encode(group):
+            ranks[card & 3].append(card >> 2)
+        for suit in range(4):
+            signatures[suit].append(tuple(sorted(ranks[suit])))
+    order = sorted(range(4), key=lambda suit: signatures[suit])
+    suits = [0] * 4
+    for position, suit in enumerate(order):
+        suits[suit] = position
+    return tuple(tuple(signatures[suit]) for suit in order), suits
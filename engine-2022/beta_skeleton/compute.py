@@ -1,75 +1,180 @@
-import eval7
+import argparse
 import itertools
-import pandas as pd
+import multiprocessing
+import numpy as np
+from equity import batch_equity, evaluate
+from tables import write_table
+from skeleton.states import FLOP_PERCENT, TURN_PERCENT
+
+_RANKS = 'AKQJT98765432'
+_PERMUTATIONS = np.array(list(itertools.permutations(range(4)))) #the 24 ways to relabel suits
 
 def calculate_strength(hole, iters):
         '''
-        A Monte Carlo method meant to estimate the win probability of a pair of 
+        A Monte Carlo method meant to estimate the win probability of a pair of
         hole cards. Simlulates 'iters' games and determines the win rates of our cards
         Arguments:
         hole: a list of our two hole cards
         iters: a integer that determines how many Monte Carlo samples to take
         '''
-        deck = eval7.Deck() #eval7 object!
-        hole_cards = [eval7.Card(card) for card in hole] #card objects, used to evaliate hands
+        equity = batch_equity(hole, iters = iters) #all samples are dealt and ranked in batches
 
-        for card in hole_cards: #remove cards that we know about! they shouldn't come up in simulations
-            deck.cards.remove(card)
+        hand_strength = equity.win + equity.tie / 2 #this is our win probability, ties count as half!
 
-        score = 0
+        return hand_strength
 
-        for _ in range(iters): #take 'iters' samples
-            deck.shuffle() #make sure our samples are random
 
-            _COMM = 5 #the number of cards we need to draw
-            _OPP = 2
+def hole_names():
+    '''
+    The 169 preflop hole classes, in the order of the rows of hole_strengths.bin
+    (suited holes, then off-suit holes, then pocket pairs)
+    '''
+    off_rank_holes = list(itertools.combinations(_RANKS, 2)) #all holes we can have EXCEPT pocket pairs (e.g. [(A, K), (A, Q), (A, J)...])
+    pocket_pair_holes = list(zip(_RANKS, _RANKS)) #all pocket pairs [(A, A), (K, K), (Q, Q)...]
 
-            draw = deck.peek(_COMM + _OPP)
+    suited_holes = [hole[0] + hole[1] + 's' for hole in off_rank_holes] #s == suited
+    off_suited_holes = [hole[0] + hole[1] + 'o' for hole in off_rank_holes] #o == off-suit
+    pocket_pairs = [hole[0] + hole[1] + 'o' for hole in pocket_pair_holes] #pocket pairs are always off suit
 
-            opp_hole = draw[: _OPP]
-            community = draw[_OPP: ]
+    return suited_holes + off_suited_holes + pocket_pairs
 
-            our_hand = hole_cards + community #the two showdown hands
-            opp_hand = opp_hole + community
 
-            our_hand_value = eval7.evaluate(our_hand) #the ranks of our hands (only useful for comparisons)
-            opp_hand_value = eval7.evaluate(opp_hand)
+def hole_classes():
+    '''
+    A 52 x 52 table mapping every pair of card indices to its row in hole_names()
+    '''
+    index = {name: i for i, name in enumerate(hole_names())}
+    table = np.zeros((52, 52), dtype=np.int64)
 
-            if our_hand_value > opp_hand_value: #we win!
-                score += 2
-            
-            elif our_hand_value == opp_hand_value: #we tie.
-                score += 1
-            
-            else: #we lost....
-                score += 0
-        
-        hand_strength = score / (2 * iters) #this is our win probability!
+    for first, second in itertools.permutations(range(52), 2):
+        high, low = max(first >> 2, second >> 2), min(first >> 2, second >> 2) #card ranks, 12 is an ace
+        suited = 's' if first & 3 == second & 3 and high != low else 'o'
+        table[first, second] = index[_RANKS[12 - high] + _RANKS[12 - low] + suited]
 
-        return hand_strength
+    return table
 
 
-if __name__ == '__main__':
+def canonical_boards():
+    '''
+    Collapses all 2,598,960 five card boards into suit isomorphism classes.
+    Two boards are equivalent when relabelling suits turns one into the other;
+    every hole class is unchanged by relabelling, so each class only needs to be scored once.
 
-    _MONTE_CARLO_ITERS = 100000
-    _RANKS = 'AKQJT98765432' 
+    Returns the smallest board of each class and the number of boards in it.
+    '''
+    boards = np.fromiter(itertools.chain.from_iterable(itertools.combinations(range(52), 5)),
+                         dtype=np.int64).reshape(-1, 5)
+    ranks, suits = boards >> 2, boards & 3
 
-    off_rank_holes = list(itertools.combinations(_RANKS, 2)) #all holes we can have EXCEPT pocket pairs (e.g. [(A, K), (A, Q), (A, J)...])
-    pocket_pair_holes = list(zip(_RANKS, _RANKS)) #all pocket pairs [(A, A), (K, K), (Q, Q)...]
+    keys = None
+    for permutation in _PERMUTATIONS: #relabel suits, sort and pack each board into one integer
+        relabelled = np.sort(4 * ranks + permutation[suits], axis = 1)
+        key = relabelled @ (52 ** np.arange(4, -1, -1))
+        keys = key if keys is None else np.minimum(keys, key)
 
-    suited_strengths = [calculate_strength([hole[0] + 'c', hole[1] + 'c'], _MONTE_CARLO_ITERS) for hole in off_rank_holes] #all holes with the same suit
-    off_suit_strengths = [calculate_strength([hole[0] + 'c', hole[1] + 'd'], _MONTE_CARLO_ITERS) for hole in off_rank_holes] #all holes with off suits
-    pocket_pair_strengths = [calculate_strength([hole[0] + 'c', hole[1] + 'd'], _MONTE_CARLO_ITERS) for hole in pocket_pair_holes] #pocket pairs must be off suit
+    keys, weights = np.unique(keys, return_counts = True)
+    canonical = (keys[:, None] // (52 ** np.arange(4, -1, -1))) % 52
 
-    suited_holes = [hole[0] + hole[1] + 's' for hole in off_rank_holes] #s == suited
-    off_suited_holes = [hole[0] + hole[1] + 'o' for hole in off_rank_holes] #o == off-suit
-    pocket_pairs = [hole[0] + hole[1] + 'o' for hole in pocket_pair_holes] #pocket pairs are always off suit
+    return canonical, weights
+
+
+_POCKETS = np.array(list(itertools.combinations(range(47), 2))) #the 1081 pockets that can be made from the 47 unseen cards
+_CONTAINING = np.array([np.nonzero((_POCKETS == card).any(axis = 1))[0] for card in range(47)]) #the 46 pockets holding each card
+
+
+def score_boards(args):
+    '''
+    Exactly scores every hole against every opposing hole on each of the given boards.
+    On one board, all 1081 pockets are ranked once; our wins are the opposing pockets ranked below us,
+    minus the ones that share one of our cards (only our own pocket shares both).
 
-    all_strengths = suited_strengths + off_suit_strengths + pocket_pair_strengths #aggregate them all
-    all_holes = suited_holes + off_suited_holes + pocket_pairs
+    Returns per hole class totals of wins, ties and opposing pockets faced, each weighted by board class size.
+    '''
+    boards, weights, classes = args
+    wins, ties, faced = np.zeros(169), np.zeros(169), np.zeros(169)
 
-    hole_df = pd.DataFrame() #make our spreadsheet with a pandas data frame!
-    hole_df['Holes'] = all_holes
-    hole_df['Strengths'] = all_strengths
+    for board, weight in zip(boards, weights):
+        unseen = np.setdiff1d(np.arange(52), board)
+        pockets = unseen[_POCKETS]
+        scores = evaluate(np.concatenate([pockets, np.broadcast_to(board, (len(pockets), 5))], axis = 1))
+
+        ordered = np.sort(scores)
+        below = np.searchsorted(ordered, scores, 'left') #pockets ranked below each pocket
+        level = np.searchsorted(ordered, scores, 'right') - below #pockets ranked the same, including our own
+
+        sharing = scores[_CONTAINING][_POCKETS] #scores of the pockets sharing our first or second card
+        below -= (sharing < scores[:, None, None]).sum(axis = (1, 2))
+        level -= (sharing == scores[:, None, None]).sum(axis = (1, 2)) - 1 #our own pocket is in both sharing lists, so it was removed once too often
+
+        hole_class = classes[pockets[:, 0], pockets[:, 1]]
+        wins += np.bincount(hole_class, weights = weight * below, minlength = 169)
+        ties += np.bincount(hole_class, weights = weight * level, minlength = 169)
+        faced += np.bincount(hole_class, weights = np.full(len(pockets), weight * 990.), minlength = 169) #45 choose 2 opposing pockets
+
+    return wins, ties, faced
+
+
+def exact_strengths(processes = None, chunk = 500):
+    '''
+    Enumerates every board for every hole class, spread over a process pool.
+    Returns the exact win and tie probabilities of each hole against a random hand, in hole_names() order.
+    '''
+    boards, weights = canonical_boards()
+    classes = hole_classes()
+    jobs = [(boards[i: i + chunk], weights[i: i + chunk], classes) for i in range(0, len(boards), chunk)]
+
+    wins, ties, faced = np.zeros(169), np.zeros(169), np.zeros(169)
+    with multiprocessing.Pool(processes) as pool:
+        for job_wins, job_ties, job_faced in pool.imap_unordered(score_boards, jobs):
+            wins += job_wins
+            ties += job_ties
+            faced += job_faced
+
+    return wins / faced, ties / faced
+
+
+def score_swaps(args):
+    '''
+    Samples one hole class under the card swap variant, with its own seed so the table is reproducible
+    '''
+    hole, iters, flop_percent, turn_percent, seed = args
+    equity = batch_equity(hole, iters = iters, rng = np.random.default_rng(seed),
+                          flop_percent = flop_percent, turn_percent = turn_percent)
+
+    return equity.win, equity.tie
+
+
+def swap_strengths(iters, flop_percent = FLOP_PERCENT, turn_percent = TURN_PERCENT, processes = None):
+    '''
+    Estimates every hole class's win and tie probabilities when hole cards can be swapped before the flop
+    and the turn, spread over a process pool one class at a time. Swaps make exact enumeration impractical,
+    so each class is sampled 'iters' times instead.
+    '''
+    holes = [[name[0] + 'c', name[1] + ('c' if name[2] == 's' else 'd')] for name in hole_names()] #one hole per class
+    jobs = [(hole, iters, flop_percent, turn_percent, seed) for seed, hole in enumerate(holes)]
+
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.map(score_swaps, jobs)
+
+    return np.array([win for win, _ in results]), np.array([tie for _, tie in results])
+
+
+if __name__ == '__main__':
 
-    hole_df.to_csv('hole_strengths.csv', index=False) #save it for later use, trade space for time!
\ No newline at end of file
+    parser = argparse.ArgumentParser(prog='python3 compute.py')
+    parser.add_argument('--swap', action='store_true',
+                        help='Build swap_strengths.bin, which models hole card swaps, instead of hole_strengths.bin')
+    parser.add_argument('--iters', type=int, default=1000000, help='Samples per hole class for --swap, defaults to 1000000')
+    args = parser.parse_args()
+
+    if args.swap:
+        win_rates, tie_rates = swap_strengths(args.iters) #swaps follow FLOP_PERCENT and TURN_PERCENT
+        name = 'swap_strengths.bin'
+        meta = {'iters': args.iters, 'flop_percent': FLOP_PERCENT, 'turn_percent': TURN_PERCENT}
+    else:
+        win_rates, tie_rates = exact_strengths() #exact, so this table is the same every time we build it
+        name = 'hole_strengths.bin'
+        meta = {'exact': True}
+
+    columns = {'Strengths': win_rates + tie_rates / 2, 'Ties': tie_rates} #ties count as half a win
+    write_table(name, hole_names(), columns, meta) #save it for later use, the bot memory-maps it at startup
@@ -0,0 +1,248 @@
+'''
+Batched Monte Carlo equity with a vectorized 5 to 7 card hand evaluator.
+Whole batches of runouts are dealt into NumPy card arrays and ranked at once with
+lookup tables indexed by 13 bit rank masks, instead of one eval7.evaluate call per sample.
+'''
+from collections import namedtuple
+import math
+import time
+import numpy as np
+from cards import encode
+
+Equity = namedtuple('Equity', ['win', 'tie', 'loss'])
+Estimate = namedtuple('Estimate', ['strength', 'low', 'high', 'samples'])
+
+_BATCH = 10000  # rows dealt per NumPy pass, bounds memory for large iteration counts
+_STREET_WEIGHTS = {0: 0.1, 3: 0.35, 4: 0.3, 5: 0.25}  # share of a round's budget for one decision on each street
+_TYPICAL_POT = 16  # pots this size get the plain per-decision budget, bigger pots get more
+
+# hand categories, stored above 5 nibbles of rank information
+HIGH_CARD, PAIR, TWO_PAIR, TRIPS, STRAIGHT, FLUSH, FULL_HOUSE, QUADS, STRAIGHT_FLUSH = range(9)
+
+
+def _build_tables():
+    '''
+    Builds the rank mask lookup tables: the highest rank, the top n ranks,
+    the nibble encoding of up to five ranks and the high card of the best straight.
+    '''
+    masks = np.arange(1 << 13)
+    bits = (masks[:, None] >> np.arange(13)) & 1
+    # number of set bits strictly above each rank
+    above = np.cumsum(bits[:, ::-1], axis=1)[:, ::-1] - bits
+    high = np.where(masks > 0, 12 - np.argmax(bits[:, ::-1], axis=1), -1)
+    top = np.stack([(bits * (above < n)) @ (1 << np.arange(13)) for n in range(6)])
+    # the k-th highest rank goes to nibble 4 - k, so ranks compare lexicographically
+    nibbles = np.where(bits & (above < 5), np.arange(13) << (4 * np.clip(4 - above, 0, 4)), 0)
+    value = nibbles.sum(axis=1)
+    straight = np.full(1 << 13, -1)
+    for rank in range(12, 3, -1):
+        window = 0b11111 << (rank - 4)
+        straight = np.where((straight < 0) & (masks & window == window), rank, straight)
+    wheel = (1 << 12) | 0b1111
+    straight = np.where((straight < 0) & (masks & wheel == wheel), 3, straight)
+    return high, top, value, straight
+
+
+_HIGH, _TOP, _VALUE, _STRAIGHT = _build_tables()
+_POWERS = 1 << np.arange(13)
+
+
+def evaluate(cards):
+    '''
+    Ranks a batch of hands. cards is an integer array of shape (n, k) with 5 <= k <= 7.
+    Returns an array of n scores; a higher score is a better hand and equal scores split the pot.
+    '''
+    n = cards.shape[0]
+    ranks = cards >> 2
+    rows = np.arange(n)[:, None]
+    counts = np.bincount((rows * 13 + ranks).ravel(), minlength=13 * n).reshape(n, 13)
+    suit_counts = np.bincount((rows * 4 + (cards & 3)).ravel(), minlength=4 * n).reshape(n, 4)
+    suit_masks = np.bincount((rows * 4 + (cards & 3)).ravel(), weights=(1 << ranks).ravel(),
+                             minlength=4 * n).reshape(n, 4).astype(np.int64)
+    any_rank = (counts >= 1) @ _POWERS
+    pairs = (counts >= 2) @ _POWERS
+    trips = (counts >= 3) @ _POWERS
+    quads = (counts >= 4) @ _POWERS
+    flush_mask = suit_masks[np.arange(n), np.argmax(suit_counts, axis=1)]
+    has_flush = suit_counts.max(axis=1) >= 5
+
+    straight_flush = np.where(has_flush, _STRAIGHT[flush_mask], -1)
+    quad_rank = _HIGH[quads]
+    trip_rank = _HIGH[trips]
+    full_pair = _HIGH[pairs & ~np.where(trip_rank >= 0, 1 << np.maximum(trip_rank, 0), 0)]
+    straight = _STRAIGHT[any_rank]
+    pair_rank = _HIGH[pairs]
+    two_pairs = _TOP[2][pairs]
+
+    conditions = [
+        straight_flush >= 0,
+        quad_rank >= 0,
+        (trip_rank >= 0) & (full_pair >= 0),
+        has_flush,
+        straight >= 0,
+        trip_rank >= 0,
+        two_pairs != _TOP[1][pairs],
+        pair_rank >= 0,
+    ]
+    choices = [
+        (STRAIGHT_FLUSH << 20) | (straight_flush << 16),
+        (QUADS << 20) | (quad_rank << 16) | (_HIGH[any_rank & ~(1 << np.maximum(quad_rank, 0))] << 12),
+        (FULL_HOUSE << 20) | (trip_rank << 16) | (full_pair << 12),
+        (FLUSH << 20) | _VALUE[_TOP[5][flush_mask]],
+        (STRAIGHT << 20) | (straight << 16),
+        (TRIPS << 20) | (trip_rank << 16) | (_VALUE[_TOP[2][any_rank & ~(1 << np.maximum(trip_rank, 0))]] >> 4),
+        (TWO_PAIR << 20) | _VALUE[two_pairs] | (_VALUE[_TOP[1][any_rank & ~two_pairs]] >> 8),
+        (PAIR << 20) | (pair_rank << 16) | (_VALUE[_TOP[3][any_rank & ~(1 << np.maximum(pair_rank, 0))]] >> 4),
+    ]
+    return np.select(conditions, choices, (HIGH_CARD << 20) | _VALUE[_TOP[5][any_rank]])
+
+
+def deal(dead, count, rng):
+    '''
+    Deals count distinct cards per row, avoiding the cards marked in the boolean array dead of shape (n, 52).
+    '''
+    keys = rng.random(dead.shape)
+    keys[dead] = 2.
+    return np.argpartition(keys, count, axis=1)[:, :count]
+
+
+def range_array(opp_range):
+    '''
+    Converts a list of two card hands to an (m, 2) array of card indices.
+    '''
+    if isinstance(opp_range, np.ndarray):
+        return opp_range
+    return np.array([encode(hand) for hand in opp_range], dtype=np.int64).reshape(-1, 2)
+
+
+def pending_swaps(board, flop_percent, turn_percent):
+    '''
+    Returns the swap probabilities still ahead of us, in dealing order, given the board so far.
+    Hole cards can be swapped just before the flop is dealt and again just before the turn.
+    '''
+    if len(board) == 0:
+        return [flop_percent, turn_percent]
+    if len(board) == 3:
+        return [turn_percent]
+    return []
+
+
+def play_out(hole, theirs, board, dead, swaps, rng):
+    '''
+    Deals each row's pending swaps and the rest of the board, then scores both hands.
+    hole is our two card indices (or an (n, 2) array of them), board is the fixed board, theirs is an (n, 2)
+    array of opposing hands, dead marks every card already out of the deck and swaps lists the pending swap probabilities.
+    Returns our scores and theirs.
+    '''
+    n = len(theirs)
+    count = 5 - len(board) + 4 * len(swaps)
+    drawn = deal(dead, count, rng) if count else np.empty((n, 0), dtype=np.int64)
+    ours = np.broadcast_to(hole, (n, 2))
+    # the swap candidates come off the top of the deck, the runout follows
+    for percent in swaps:
+        swapped = rng.random((n, 4)) < percent
+        ours = np.where(swapped[:, :2], drawn[:, :2], ours)
+        theirs = np.where(swapped[:, 2:], drawn[:, 2:4], theirs)
+        drawn = drawn[:, 4:]
+    common = np.concatenate([np.broadcast_to(board, (n, len(board))), drawn], axis=1)
+    return evaluate(np.concatenate([ours, common], axis=1)), evaluate(np.concatenate([theirs, common], axis=1))
+
+
+def batch_equity(hole, board=(), iters=1000, opp_range=None, weights=None, rng=None,
+                 flop_percent=0., turn_percent=0.):
+    '''
+    Estimates our win, tie and loss rates from iters sampled runouts.
+    The opponent holds a random hand, or a hand drawn from opp_range (with optional weights)
+    when one is given. Hands in the range that collide with our cards or the board are dropped.
+
+    With nonzero flop_percent and turn_percent, runouts follow the engine's card swap variant:
+    each of the four hole cards is independently replaced by a fresh deck card with probability
+    flop_percent before the flop and turn_percent before the turn, and swapped out cards are dead.
+    '''
+    rng = np.random.default_rng() if rng is None else rng
+    hole = np.array(encode(hole), dtype=np.int64)
+    board = np.array(encode(board), dtype=np.int64)
+    known = np.zeros(52, dtype=bool)
+    known[hole] = True
+    known[board] = True
+    if opp_range is not None:
+        hands = range_array(opp_range)
+        live = ~known[hands].any(axis=1)
+        hands = hands[live]
+        weights = None if weights is None else np.asarray(weights, dtype=float)[live]
+        if weights is not None:
+            weights = weights / weights.sum()
+    swaps = [percent for percent in pending_swaps(board, flop_percent, turn_percent) if percent > 0.]
+    wins = ties = 0
+    for start in range(0, iters, _BATCH):
+        n = min(_BATCH, iters - start)
+        dead = np.broadcast_to(known, (n, 52)).copy()
+        if opp_range is None:
+            theirs = deal(dead, 2, rng)
+        else:
+            theirs = hands[rng.choice(len(hands), n, p=weights)]
+        dead[np.arange(n)[:, None], theirs] = True
+        ours, theirs = play_out(hole, theirs, board, dead, swaps, rng)
+        wins += int(np.count_nonzero(ours > theirs))
+        ties += int(np.count_nonzero(ours == theirs))
+    return Equity(wins / iters, ties / iters, (iters - wins - ties) / iters)
+
+
+def matchup_strengths(hole, board, hands, iters, rng=None, flop_percent=0., turn_percent=0.):
+    '''
+    Estimates our strength (wins plus half of ties) against each opposing hand separately, from iters runouts each.
+    hands must not collide with our cards or the board. Returns an array with one strength per hand.
+    '''
+    rng = np.random.default_rng() if rng is None else rng
+    hole = np.array(encode(hole), dtype=np.int64)
+    board = np.array(encode(board), dtype=np.int64)
+    hands = np.repeat(range_array(hands), iters, axis=0)
+    known = np.zeros(52, dtype=bool)
+    known[hole] = True
+    known[board] = True
+    swaps = [percent for percent in pending_swaps(board, flop_percent, turn_percent) if percent > 0.]
+    scores = np.empty(len(hands))
+    for start in range(0, len(hands), _BATCH):
+        theirs = hands[start:start + _BATCH]
+        dead = np.broadcast_to(known, (len(theirs), 52)).copy()
+        dead[np.arange(len(theirs))[:, None], theirs] = True
+        ours, theirs = play_out(hole, theirs, board, dead, swaps, rng)
+        scores[start:start + _BATCH] = (ours > theirs) + (ours == theirs) / 2
+    return scores.reshape(-1, iters).mean(axis=1)
+
+
+def time_budget(game_clock, rounds_left, street, pot, reserve=0.2):
+    '''
+    Returns the seconds to spend on one decision. The clock left after a safety reserve is split
+    evenly over the remaining rounds, then scaled by street and by how much is in the pot.
+    A single decision never gets more than a tenth of the remaining clock.
+    '''
+    per_round = game_clock * (1. - reserve) / max(rounds_left, 1)
+    scale = min(4., max(0.25, pot / _TYPICAL_POT))
+    return max(0., min(per_round * _STREET_WEIGHTS[street] * scale, game_clock / 10.))
+
+
+def anytime_equity(hole, board=(), budget=0.01, opp_range=None, weights=None, rng=None,
+                   flop_percent=0., turn_percent=0., batch=500, z=1.96):
+    '''
+    Samples batches of runouts until budget seconds run out, and at least one batch.
+    Returns the strength (wins plus half of ties) with a normal confidence interval at z standard errors.
+    '''
+    start = time.perf_counter()
+    rng = np.random.default_rng() if rng is None else rng
+    opp_range = None if opp_range is None else range_array(opp_range)
+    wins = ties = samples = 0
+    while True:
+        equity = batch_equity(hole, board, batch, opp_range, weights, rng, flop_percent, turn_percent)
+        wins += equity.win * batch
+        ties += equity.tie * batch
+        samples += batch
+        elapsed = time.perf_counter() - start
+        # stop unless another batch of the same cost still fits
+        if elapsed * (samples + batch) / samples > budget:
+            break
+    strength = (wins + ties / 2) / samples
+    # each sample scores 1, 1/2 or 0
+    variance = max(0., (wins + ties / 4) / samples - strength ** 2)
+    error = z * math.sqrt(variance / samples)
+    return Estimate(strength, max(0., strength - error), min(1., strength + error), samples)
@@ -0,0 +1,164 @@
+'''
+Running statistics of how the opponent plays, fed one finished round at a time from handle_round_over.
+Each round's previous_state chain is walked once, so an update costs O(actions), and every statistic is kept
+as counters that get_action can read in O(1) without looking at old rounds again.
+'''
+from collections import namedtuple
+import bisect
+from skeleton.states import STARTING_STACK
+from ranges import blocked, combo_indices
+from tracker import made_hand_strengths
+
+CHECK, CALL, RAISE, FOLD = range(4)
+STREETS = {0: 0, 3: 1, 4: 2, 5: 3}  # street to index: preflop, flop, turn, river
+BET_SIZES = (0.25, 0.5, 0.75, 1., 1.5, 2.)  # bin edges of the bet size histogram, in pots
+
+# one action of a finished round: chips put in by it, the cost of calling before it and the pot before it
+RoundAction = namedtuple('RoundAction', ['street', 'seat', 'action', 'chips', 'cost', 'pot'])
+
+
+def round_actions(terminal_state):
+    '''
+    Recovers the actions of a finished round, in order, from the RoundStates in its previous_state chain.
+    '''
+    states = []
+    state = terminal_state.previous_state
+    while state is not None:
+        states.append(state)
+        state = state.previous_state
+    states.reverse()
+    actions = []
+    closing_call = False
+    for before, after in zip(states, states[1:]):
+        seat = before.button % 2
+        cost = before.pips[1-seat] - before.pips[seat]
+        pot = 2 * STARTING_STACK - before.stacks[0] - before.stacks[1]
+        if after.street != before.street:  # the street ended on a check, or on the call we already counted
+            if not closing_call:
+                actions.append(RoundAction(before.street, seat, CHECK, 0, cost, pot))
+            closing_call = False
+            continue
+        chips = after.pips[seat] - before.pips[seat]
+        if chips == 0:
+            action = CHECK
+        elif after.pips[seat] == before.pips[1-seat]:
+            action = CALL
+        else:
+            action = RAISE
+        closing_call = action == CALL and before.button > 0  # only the small blind's limp leaves the street open
+        actions.append(RoundAction(before.street, seat, action, chips, cost, pot))
+    # the last action only has a state of its own if it was a call
+    last = states[-1]
+    seat = last.button % 2
+    cost = last.pips[1-seat] - last.pips[seat]
+    pot = 2 * STARTING_STACK - last.stacks[0] - last.stacks[1]
+    if cost > 0:  # the round ended facing a bet, so it was folded
+        actions.append(RoundAction(last.street, seat, FOLD, 0, cost, pot))
+    elif not closing_call:  # checked down to showdown
+        actions.append(RoundAction(last.street, seat, CHECK, 0, cost, pot))
+    return actions
+
+
+def _ratio(count, total, min_count=1):
+    return count / total if total >= min_count else None
+
+
+class OpponentStats():
+    '''
+    Counters of the opponent's actions over every round seen so far. Call observe once per finished round.
+    The ratios are None until there is something to count.
+    '''
+
+    def __init__(self):
+        self.rounds = 0
+        self.voluntary = 0  # rounds the opp put chips in preflop without being forced to
+        self.preflop_raises = 0  # rounds the opp raised preflop
+        self.raises = [0, 0, 0, 0]  # bets and raises per street index
+        self.calls = [0, 0, 0, 0]
+        self.bets_faced = [0, 0, 0, 0]  # times the opp had to call a bet or raise, not counting the blinds
+        self.folds = [0, 0, 0, 0]
+        self.bet_sizes = [0] * (len(BET_SIZES) + 1)  # bets and raises by chips put in per pot, binned by BET_SIZES
+        self.showdown_strength = [[0.] * 3 for _ in STREETS]  # summed by street index and strongest action there
+        self.showdowns = [[0] * 3 for _ in STREETS]
+
+    def observe(self, terminal_state, active):
+        '''
+        Counts the opponent's actions in a finished round, and their hand strength if it went to showdown.
+        '''
+        opponent = 1 - active
+        self.rounds += 1
+        strongest = [None] * len(STREETS)  # the opp's most aggressive action on each street, CHECK < CALL < RAISE
+        folded = False
+        for i, (street, seat, action, chips, cost, pot) in enumerate(round_actions(terminal_state)):
+            if seat != opponent:
+                continue
+            index = STREETS[street]
+            facing_bet = cost > 0 and i > 0  # the first action of a round only faces the big blind
+            if facing_bet:
+                self.bets_faced[index] += 1
+            if action == FOLD:
+                if facing_bet:
+                    self.folds[index] += 1
+                folded = True
+                continue
+            if action == RAISE:
+                self.raises[index] += 1
+                self.bet_sizes[bisect.bisect_right(BET_SIZES, chips / pot)] += 1
+            elif action == CALL:
+                self.calls[index] += 1
+            if strongest[index] is None or action > strongest[index]:
+                strongest[index] = action
+        if strongest[0] in (CALL, RAISE):
+            self.voluntary += 1
+        if strongest[0] == RAISE:
+            self.preflop_raises += 1
+        previous_state = terminal_state.previous_state
+        hand = previous_state.hands[opponent]
+        if not folded and len(hand) == 2 and len(previous_state.deck) == 5:
+            board = previous_state.deck
+            strength = float(made_hand_strengths(board, ~blocked(board))[combo_indices([hand])[0]])
+            for index, action in enumerate(strongest):
+                if action is not None:
+                    self.showdown_strength[index][action] += strength
+                    self.showdowns[index][action] += 1
+
+    def vpip(self):
+        '''
+        Share of rounds the opp voluntarily put chips in preflop.
+        '''
+        return _ratio(self.voluntary, self.rounds)
+
+    def pfr(self):
+        '''
+        Share of rounds the opp raised preflop.
+        '''
+        return _ratio(self.preflop_raises, self.rounds)
+
+    def aggression(self, street):
+        '''
+        The opp's bets and raises per call on a street (0, 3, 4 or 5).
+        '''
+        index = STREETS[street]
+        return _ratio(self.raises[index], self.calls[index])
+
+    def fold_to_bet(self, street, min_count=1):
+        '''
+        Share of the bets and raises the opp folded to on a street, or None until they faced min_count of them.
+        '''
+        index = STREETS[street]
+        return _ratio(self.folds[index], self.bets_faced[index], min_count)
+
+    def bet_size_shares(self):
+        '''
+        Share of the opp's bets and raises in each BET_SIZES bin.
+        '''
+        total = sum(self.bet_sizes)
+        return [_ratio(count, total) for count in self.bet_sizes]
+
+    def strength_at_showdown(self, street, action):
+        '''
+        The opp's mean made hand strength at showdown, on the final board, when their most aggressive action
+        on a street was action (CHECK, CALL or RAISE).
+        '''
+        index = STREETS[street]
+        return _ratio(self.showdown_strength[index][action], self.showdowns[index][action])
@@ -0,0 +1,114 @@
+'''
+Opponent ranges as weights over all 1326 two card hands.
+Every hand has a fixed slot in COMBOS and a 52 bit card mask, so removing blocked hands,
+filtering and weighting a range are NumPy array operations instead of scans over lists of card strings.
+'''
+import itertools
+import numpy as np
+from cards import RANKS, encode, decode
+
+COMBOS = np.array(list(itertools.combinations(range(52), 2)), dtype=np.int64)  # in eval7.Deck() pairing order
+COMBO_MASKS = (np.uint64(1) << COMBOS[:, 0].astype(np.uint64)) | (np.uint64(1) << COMBOS[:, 1].astype(np.uint64))
+COMBO_INDEX = np.full((52, 52), -1, dtype=np.int64)  # slot of the hand holding both cards, in either order
+COMBO_INDEX[COMBOS[:, 0], COMBOS[:, 1]] = np.arange(len(COMBOS))
+COMBO_INDEX[COMBOS[:, 1], COMBOS[:, 0]] = np.arange(len(COMBOS))
+
+
+def card_mask(cards):
+    '''
+    Packs card strings into a 52 bit mask, bit 4 * rank + suit for each card.
+    '''
+    mask = 0
+    for card in encode(cards):
+        mask |= 1 << card
+    return mask
+
+
+def blocked(cards):
+    '''
+    Returns a boolean array marking the hands that hold any of the given cards.
+    '''
+    return (COMBO_MASKS & np.uint64(card_mask(cards))) != 0
+
+
+def combo_indices(hands):
+    '''
+    Returns the COMBOS slot of each two card hand in a list of hands.
+    '''
+    hands = np.array([encode(hand) for hand in hands], dtype=np.int64).reshape(-1, 2)
+    return COMBO_INDEX[hands[:, 0], hands[:, 1]]
+
+
+def relabelled_combos(suits):
+    '''
+    Returns the COMBOS slot of every hand after relabelling its suits, suits[suit] being the new label of each suit.
+    '''
+    cards = np.arange(52)
+    relabelled = (cards & ~3) | np.array(suits, dtype=np.int64)[cards & 3]
+    return COMBO_INDEX[relabelled[COMBOS[:, 0]], relabelled[COMBOS[:, 1]]]
+
+
+def class_names():
+    '''
+    Returns the preflop class of each hand in COMBOS, named like the rows of hole_strengths.bin (AKs, AKo, AAo).
+    '''
+    # the second card of every combo is the higher one, so its rank comes first
+    return [RANKS[second >> 2] + RANKS[first >> 2] + ('s' if first & 3 == second & 3 else 'o') for first, second in COMBOS]
+
+
+class Range():
+    '''
+    Weights over the hands in COMBOS. A hand with weight zero is out of the range.
+    '''
+
+    def __init__(self, weights=None):
+        self.weights = np.ones(len(COMBOS)) if weights is None else np.array(weights, dtype=float)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.weights))
+
+    def copy(self):
+        return Range(self.weights)
+
+    @property
+    def live(self):
+        '''
+        A boolean array marking the hands still in the range.
+        '''
+        return self.weights > 0
+
+    def remove_cards(self, cards):
+        '''
+        Drops every hand holding one of the given cards, for example our hole cards or the board.
+        '''
+        self.weights[blocked(cards)] = 0.
+
+    def remove_hands(self, hands):
+        '''
+        Drops the given hands, each a pair of card strings in either order.
+        '''
+        self.weights[combo_indices(hands)] = 0.
+
+    def keep(self, mask):
+        '''
+        Drops every hand not marked in the boolean array mask.
+        '''
+        self.weights[~mask] = 0.
+
+    def hands(self):
+        '''
+        Returns the hands in the range as an (m, 2) array of card indices.
+        '''
+        return COMBOS[self.live]
+
+    def live_weights(self):
+        '''
+        Returns the weights of the hands in the range, in the order of hands().
+        '''
+        return self.weights[self.live]
+
+    def to_strings(self):
+        '''
+        Returns the hands in the range as pairs of card strings.
+        '''
+        return [decode(hand) for hand in self.hands()]
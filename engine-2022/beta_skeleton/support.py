@@ -1,7 +1,34 @@
+import atexit
 import eval7
 import numpy as np
-import pandas as pd
 import random
+import math
+import time
+from equity import batch_equity, anytime_equity, matchup_strengths, Estimate
+from cache import EquityCache
+from cards import canonical, canonical_suits
+from ranges import Range, COMBOS, blocked, relabelled_combos
+from skeleton.states import FLOP_PERCENT, TURN_PERCENT
+
+EQUITY_CACHE = EquityCache(maxsize = 5000, meta = {'flop_percent': FLOP_PERCENT, 'turn_percent': TURN_PERCENT}) # shared by the strength functions below, keyed by suit isomorphism class, only valid for these swap odds; matchup tables are 5KB each, so it holds a bounded number of spots
+_KEPT_FILES = set() # files EQUITY_CACHE was loaded from in this process
+_PRECISE_SAMPLES = 20000 # cached strengths from this many samples are reused without sampling again
+_PRECISE_MATCHUPS = 100 # cached strengths against every opp hand from this many samples each are reused without sampling again
+
+
+def keep_equity_cache(path):
+    """
+    Loads the estimates saved at path into EQUITY_CACHE and saves them back there when the process exits,
+    even if the game stops before its last round. A reused process only loads the file once,
+    loading it again would double count.
+    """
+
+    if path in _KEPT_FILES:
+        return
+    _KEPT_FILES.add(path)
+    EQUITY_CACHE.load(path)
+    atexit.register(EQUITY_CACHE.save, path)
+
 
 
 def gen_possible_hands(hole, comm = None, cleared_hands = []):
@@ -11,48 +38,22 @@ def gen_possible_hands(hole, comm = None, cleared_hands = []):
     Returns list of Cards in str format
     """
 
-    deck = eval7.Deck() # deck of cards
-    hole_cards = [eval7.Card(card) for card in hole]
-    for hole_card in hole_cards:
-        deck.cards.remove(hole_card)
-
-
-    if comm: # if there are community cards
-        comm_cards = [eval7.Card(card) for card in comm]
-        for comm_card in comm_cards:
-            deck.cards.remove(comm_card)
+    return possible_range(hole, comm, cleared_hands).to_strings() # same order as pairing up an eval7 deck
 
-    possible_hands = []
 
-    # generating len(deck) choose 2 possible pairings
-    for first_card in range(len(deck)):
-        for second_card in range(first_card+1,len(deck)):
-            possible_hands.append([deck[first_card],deck[second_card]])
 
-    preclearing_str_possible_hands = []
-
-    for hand in possible_hands:
-        str_hand = str(hand)
-        split = str_hand.split('(')
-        str_hand = [split[1][1:3],split[2][1:3]]
-        preclearing_str_possible_hands.append(str_hand)
-    
-    if cleared_hands == []:
-        return preclearing_str_possible_hands
-    
+def possible_range(hole, comm = None, cleared_hands = []):
+    """
+    The Range version of gen_possible_hands, every hand not blocked by our cards,
+    the community cards or our estimate of what the opp doesn't have
+    """
 
-    str_possible_hands = []
-    for str_hand in preclearing_str_possible_hands:
-        adding = True
-        for cleared_hand in cleared_hands:
-            if set(str_hand) == set(cleared_hand): # if the hand has been cleared by our range estimate, using set objects to check for diff orders
-                adding = False
-        
-        if adding:
-            str_possible_hands.append(str_hand)
-    
+    possible = Range()
+    possible.remove_cards(list(hole) + list(comm or [])) # blocked hands, one mask test per hand
+    if cleared_hands:
+        possible.remove_hands(cleared_hands) # the slot of each cleared hand, in either card order
 
-    return str_possible_hands
+    return possible
 
 
 
@@ -120,59 +121,14 @@ def calc_strength(hole, iters, community = []):
         returns float of win rate
         '''
 
-        deck = eval7.Deck() # deck of cards
-        hole_cards = [eval7.Card(card) for card in hole] # our hole cards in eval7 friendly format
-
-        if community != []:
-            community_cards = [eval7.Card(card) for card in community]
-            for card in community_cards: #removing the current community cards from the deck
-                deck.cards.remove(card)
-
-
-
-        for card in hole_cards: #removing our hole cards from the deck
-            deck.cards.remove(card)
-        
-        
-        
-        score = 0 
-
-        for _ in range(iters): # MC the probability of winning
-            deck.shuffle()
-
-            _COMM = 5 - len(community)
-            _OPP = 2 
-
-            draw = deck.peek(_COMM + _OPP)  
-            
-            opp_hole = draw[:_OPP]
-            alt_community = draw[_OPP:]
-
-            
-            if community == []:
-                our_hand = hole_cards  + alt_community
-                opp_hand = opp_hole  + alt_community
-            else: 
-
-                our_hand = hole_cards + community_cards + alt_community
-                opp_hand = opp_hole + community_cards + alt_community
-
-
-            our_hand_value = eval7.evaluate(our_hand)
-            opp_hand_value = eval7.evaluate(opp_hand)
-
-            if our_hand_value > opp_hand_value:
-                score += 2 
+        key = ('hand', canonical(hole, community)) # the same for every suit relabelling of this spot
+        entry = EQUITY_CACHE.get(key, iters)
+        if entry is not None:
+            return entry[0]
 
-            if our_hand_value == opp_hand_value:
-                score += 1 
+        equity = batch_equity(hole, community, iters, flop_percent = FLOP_PERCENT, turn_percent = TURN_PERCENT) # all iters runouts are dealt and ranked in one batch, modelling future hole card swaps
 
-            else: 
-                score += 0        
-
-        hand_strength = score/(2*iters) # win probability 
-
-        return hand_strength
+        return EQUITY_CACHE.put(key, equity.win + equity.tie / 2, iters)[0] # ties count as half a win, merged with anything cached
 
 
 
@@ -180,76 +136,119 @@ def calc_strength(hole, iters, community = []):
 
 def calc_strength_against_range(hole, iters, community = [], opp_range = [], prob_inclusion = 0.3):
     """
-    Calculates strength against a range of hands the opponent could have
+    Calculates strength against a range of hands the opponent could have,
+    averaging our strength against each hand in the range.
+    prob_inclusion is the fraction of the iters samples per hand we skip to save time.
+    Each hand's strength is cached, so hands seen in earlier spots cost nothing.
+    opp_range can be a list of hands or a Range, whose weights are ignored here.
 
     Returns float of win rate
     """
-        
 
-    total_score = 0.0
+    if isinstance(opp_range, Range):
+        opp_range = opp_range.to_strings()
+
     if opp_range == []:
         opp_range = gen_possible_hands(hole,comm = community)
-    for opp_hand in opp_range:
-
-
-        deck = eval7.Deck() # deck of cards
-        hole_cards = [eval7.Card(card) for card in hole] # our hole cards
-
-        if community != []:
-            community_cards = [eval7.Card(card) for card in community]
-            for card in community_cards: #removing the current community cards from the deck
-                deck.cards.remove(card)
 
+    samples = max(1, int(round(iters * (1 - prob_inclusion))))
+    known = set(hole) | set(community)
 
+    strengths = []
+    missing_hands, missing_keys = [], []
+    for opp_hand in opp_range:
+        if known.intersection(opp_hand): # the hand collides with our cards or the board
+            continue
+        key = ('vs', canonical(hole, community, opp_hand))
+        entry = EQUITY_CACHE.get(key, samples)
+        if entry is None:
+            missing_hands.append(opp_hand)
+            missing_keys.append(key)
+        else:
+            strengths.append(entry[0])
 
-        for card in hole_cards: #removing our hole cards from the deck
-            deck.cards.remove(card)
-
-
-        opp_hole_cards = [eval7.Card(card) for card in opp_hand]
-        for card in opp_hole_cards: #removing expected opp hole cards from deck
-            deck.cards.remove(card)
-
-
-        score = 0
-        for _ in range(iters): # MC the probability of winning
-            if prob_inclusion >= random.random():
-                continue
-            
-            deck.shuffle()
-
-            _COMM = 5 - len(community)
+    if missing_hands: # every uncached hand is sampled in one batch
+        new_strengths = matchup_strengths(hole, community, missing_hands, samples,
+                                          flop_percent = FLOP_PERCENT, turn_percent = TURN_PERCENT)
+        for key, strength in zip(missing_keys, new_strengths):
+            strengths.append(EQUITY_CACHE.put(key, strength, samples)[0])
 
-            draw = deck.peek(_COMM)  
-            alt_community = draw
+    if not strengths: # every hand in the range is blocked by our cards or the board, so it tells us nothing
+        return calc_strength(hole, iters, community)
 
-            
-            if community == []:
-                our_hand = hole_cards  + alt_community
-                opp_hand = opp_hole_cards  + alt_community
-            else: 
+    return sum(strengths) / len(strengths)
 
-                our_hand = hole_cards + community_cards + alt_community
-                opp_hand = opp_hole_cards + community_cards + alt_community
 
 
-            our_hand_value = eval7.evaluate(our_hand)
-            opp_hand_value = eval7.evaluate(opp_hand)
+def matchup_table(hole, budget, community = []):
+    """
+    Returns our strength against every hand in COMBOS (0 for the blocked ones) and how many runouts each is from.
+    The strengths of a spot are cached together, keyed by its suit isomorphism class and stored in that class's
+    suit labelling, so every decision in an equivalent spot reuses them. Until they are precise,
+    each call samples more runouts against every hand for budget seconds (at least one each) and merges them in.
 
-            if our_hand_value > opp_hand_value:
-                score += 2 
+    Returns an array of 1326 strengths and the runouts per hand
+    """
 
-            elif our_hand_value == opp_hand_value:
-                score += 1 
+    key, suits = canonical_suits(hole, community)
+    key = ('matchups', key)
+    slots = relabelled_combos(suits) # where each hand's strength is kept in the cached table
+    entry = EQUITY_CACHE.get(key, _PRECISE_MATCHUPS)
+    if entry is None:
+        unblocked = ~blocked(list(hole) + list(community))
+        hands = COMBOS[unblocked]
+        start = time.perf_counter()
+        scores = np.zeros(len(hands))
+        samples = 0
+        while True: # one runout against every hand at a time, until another would not fit in budget
+            scores += matchup_strengths(hole, community, hands, 1, flop_percent = FLOP_PERCENT, turn_percent = TURN_PERCENT)
+            samples += 1
+            elapsed = time.perf_counter() - start
+            if elapsed * (samples + 1) / samples > budget:
+                break
+        strengths = np.zeros(len(COMBOS), dtype = np.float32)
+        strengths[slots[unblocked]] = scores / samples
+        entry = EQUITY_CACHE.put(key, strengths, samples)
+    strengths, samples = entry
+    return strengths[slots], samples
+
+
+
+def estimate_strength_against_range(hole, budget, community = [], opp_range = []):
+    """
+    Calculates strength against a range of hands the opponent could have,
+    sampling for budget seconds instead of a fixed number of iterations.
+    opp_range can be a list of hands or a weighted Range. A Range with no weight left
+    beside our cards and the board counts as a random hand.
+    Against a Range, our strength is the weighted mean of the cached matchup_table strengths,
+    so the range can change between decisions without sampling again.
+
+    Returns an Estimate with the win rate and its confidence interval
+    """
 
-            else: 
-                score += 0        
+    unblocked = ~blocked(list(hole) + list(community))
+    if isinstance(opp_range, Range) and opp_range.weights[unblocked].sum() > 0: # the opp's hands count by their weights
+        strengths, samples = matchup_table(hole, budget, community)
+        weights = opp_range.weights * unblocked
+        total = float(weights.sum())
+        strength = float(weights @ strengths) / total
+        spread = float(weights @ weights) / total ** 2 # how much the weights concentrate the sampling error
+        error = 1.96 * math.sqrt(strength * (1 - strength) * spread / samples) # scores are at most this spread
+        return Estimate(strength, max(0, strength - error), min(1, strength + error), samples * int(np.count_nonzero(weights)))
 
-        hand_strength = score/(2*iters) # win probability for this opp_hole
-        total_score += hand_strength 
+    if not isinstance(opp_range, Range) and opp_range != []:
+        return anytime_equity(hole, community, budget, opp_range = opp_range,
+                              flop_percent = FLOP_PERCENT, turn_percent = TURN_PERCENT)
 
-    total_hand_strength = total_score / len(opp_range)
-    return total_hand_strength
+    # every unseen hand is equally likely, so this is our strength against a random hand and can share its cache entry
+    key = ('hand', canonical(hole, community))
+    entry = EQUITY_CACHE.get(key, _PRECISE_SAMPLES)
+    if entry is None:
+        estimate = anytime_equity(hole, community, budget, flop_percent = FLOP_PERCENT, turn_percent = TURN_PERCENT)
+        entry = EQUITY_CACHE.put(key, estimate.strength, estimate.samples)
+    strength, samples = entry
+    error = 1.96 * math.sqrt(strength * (1 - strength) / samples) # scores are at most this spread
+    return Estimate(strength, max(0, strength - error), min(1, strength + error), samples)
 
 
 
@@ -345,26 +344,6 @@ def calc_potential(self, hole, comm):
 
 
 
-def get_mean_strength_from_range(opp_range_mapping):
-    """
-    Getting mean strength value from the opp_range_mapping
-    """
-
-    strengths = np.array(opp_range_mapping.values())
-    return np.mean(strengths)
-
-
-
-
-def get_std_of_range_strengths(opp_range_mapping):
-    """
-    Getting standard deviation of strengths from an opponent's range
-    """
-
-    strengths = np.array(opp_range_mapping.values())
-    return np.std(strengths)
-
-
 if __name__ == "__main__":
     opp_range = gen_possible_hands(["As","Ad"],comm=["Ks","Ah","Ac"],cleared_hands=[["Ac","Ah"]])
     print(opp_range)
@@ -0,0 +1,112 @@
+'''
+Precomputed tables (hole strengths and the like) in a versioned binary format the bot memory-maps.
+
+A file starts with a header (magic, version, column count, row count and the length of the metadata JSON),
+followed by the metadata JSON: the column names, the key of each row (for hole strengths, the hole classes
+of compute.hole_names()) and anything the writer wants to record about how the table was made.
+The JSON is padded to a multiple of 8 bytes and followed by the data, little endian float64, one column
+after another, so every column is one contiguous array.
+
+Tables are only read when first used, and then straight from the page cache, so loading one costs
+almost nothing however large it is. Run python3 tables.py FILE to print a table as CSV.
+'''
+import struct
+import json
+import mmap
+import sys
+import os
+import numpy as np
+
+MAGIC = b'PBTB'
+VERSION = 1
+HEADER_FORMAT = '<4sHHII'  # magic, version, column count, row count, length of the metadata JSON
+ALIGNMENT = 8
+
+
+def write_table(path, keys, columns, meta=None):
+    '''
+    Writes a table with one row per key. columns maps each column name to its values, in key order.
+    The file is replaced atomically, so bots that have the old table mapped keep reading it.
+    '''
+    keys = list(keys)
+    names = list(columns)
+    data = np.array([np.asarray(columns[name], dtype='<f8') for name in names]).reshape(len(names), len(keys))
+    metadata = json.dumps({'columns': names, 'keys': keys, 'meta': meta or {}}).encode()
+    metadata += b' ' * (-(struct.calcsize(HEADER_FORMAT) + len(metadata)) % ALIGNMENT)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as table_file:
+        table_file.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, len(names), len(keys), len(metadata)))
+        table_file.write(metadata)
+        table_file.write(data.tobytes())
+    os.replace(temp_path, path)
+
+
+class Table():
+    '''
+    A memory-mapped table. Rows are looked up by key or by row index, columns come back as read-only arrays
+    backed by the mapping.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.mapping = None
+        self.columns = None
+        self.keys = None
+        self.meta = None
+        self.rows = None
+        self.data = None
+
+    def open(self):
+        '''
+        Maps the file and reads its header, unless that was already done. Raises ValueError if it isn't a table
+        this version can read.
+        '''
+        if self.mapping is not None:
+            return self
+        with open(self.path, 'rb') as table_file:
+            mapping = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        header_size = struct.calcsize(HEADER_FORMAT)
+        magic, version, column_count, row_count, metadata_size = struct.unpack_from(HEADER_FORMAT, mapping)
+        if magic != MAGIC:
+            raise ValueError(self.path + ' is not a table')
+        if version != VERSION:
+            raise ValueError('{} has version {}, expected {}'.format(self.path, version, VERSION))
+        metadata = json.loads(mapping[header_size:header_size + metadata_size])
+        self.data = np.frombuffer(mapping, dtype='<f8', count=column_count * row_count,
+                                  offset=header_size + metadata_size).reshape(column_count, row_count)
+        self.columns = {name: i for i, name in enumerate(metadata['columns'])}
+        self.keys = metadata['keys']
+        self.rows = {key: i for i, key in enumerate(self.keys)}
+        self.meta = metadata['meta']
+        self.mapping = mapping
+        return self
+
+    def __len__(self):
+        return len(self.open().keys)
+
+    def column(self, name):
+        '''
+        Returns a column as an array in row order.
+        '''
+        self.open()
+        return self.data[self.columns[name]]
+
+    def index(self, key):
+        '''
+        Returns the row index of a key.
+        '''
+        return self.open().rows[key]
+
+    def lookup(self, key, name):
+        '''
+        Returns one value by row key and column name.
+        '''
+        self.open()
+        return float(self.data[self.columns[name], self.rows[key]])
+
+
+if __name__ == '__main__':
+    table = Table(sys.argv[1]).open()
+    print(','.join(['Key'] + list(table.columns)))
+    for i, key in enumerate(table.keys):
+        print(','.join([key] + [repr(float(value)) for value in table.data[:, i]]))
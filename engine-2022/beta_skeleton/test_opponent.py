@@ -0,0 +1,34 @@
+'''
+Checks OpponentStats on hand built rounds. Run from this directory: python3 -m pytest test_opponent.py
+'''
+from skeleton.actions import FoldAction, CallAction, RaiseAction
+from skeleton.states import RoundState, STARTING_STACK, SMALL_BLIND, BIG_BLIND
+from opponent import OpponentStats, round_actions, FOLD, CALL, RAISE
+
+
+def new_round():
+    pips = [SMALL_BLIND, BIG_BLIND]
+    stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
+    return RoundState(0, 0, pips, stacks, [[], []], [], None)
+
+
+def test_opening_small_blind_fold_is_not_a_fold_to_a_bet():
+    stats = OpponentStats()
+    terminal_state = new_round().proceed(FoldAction())  # the opp, in the small blind, folds to the blind
+    assert [action.action for action in round_actions(terminal_state)] == [FOLD]
+    stats.observe(terminal_state, active=1)
+    assert stats.bets_faced[0] == 0
+    assert stats.folds[0] == 0
+    assert stats.fold_to_bet(0) is None
+    assert stats.vpip() == 0
+
+
+def test_fold_to_a_raise_counts():
+    stats = OpponentStats()
+    # we limp in from the small blind, the opp raises, we reraise and the opp folds
+    round_state = new_round().proceed(CallAction()).proceed(RaiseAction(6)).proceed(RaiseAction(18))
+    terminal_state = round_state.proceed(FoldAction())
+    assert [action.action for action in round_actions(terminal_state)] == [CALL, RAISE, RAISE, FOLD]
+    stats.observe(terminal_state, active=0)
+    assert stats.fold_to_bet(0) == 1.
+    assert stats.pfr() == 1.
@@ -0,0 +1,127 @@
+'''
+A Bayesian estimate of the opponent's hand. Every hand in the range keeps a weight, and each
+observed action multiplies the weights by how likely that action is with each hand, so unlikely
+hands fade out instead of being deleted. Every update is a handful of NumPy passes over the 1326 combos.
+'''
+import numpy as np
+from cards import encode
+from equity import evaluate
+from ranges import Range, COMBOS
+
+_BLUFF_FLOOR = 0.15  # every hand keeps at least this likelihood for any action, so bluffs and slowplays survive
+_SPREAD = 0.1  # how sharply the likelihoods switch from weak hands to strong ones
+_CHECK_THRESHOLD = 0.7  # hands above this strength usually bet instead of checking
+
+
+def _likelihood(strengths, threshold, stronger=True):
+    '''
+    A smooth step from _BLUFF_FLOOR to 1 around threshold, rising with strength when stronger is True.
+    '''
+    edge = (strengths - threshold) / _SPREAD
+    step = 1 / (1 + np.exp(-edge if stronger else edge))
+    return _BLUFF_FLOOR + (1 - _BLUFF_FLOOR) * step
+
+
+def made_hand_strengths(board, live):
+    '''
+    Ranks every hand marked in live by its made hand on the board (3 to 5 cards).
+    A hand's strength is the share of the other live hands it beats, with ties counting half;
+    card overlaps between hands are ignored.
+    '''
+    board = np.array(encode(board), dtype=np.int64)
+    hands = COMBOS[live]
+    scores = evaluate(np.concatenate([hands, np.broadcast_to(board, (len(hands), len(board)))], axis=1))
+    ordered = np.sort(scores)
+    below = np.searchsorted(ordered, scores, 'left')
+    level = np.searchsorted(ordered, scores, 'right') - below - 1  # not counting the hand itself
+    strengths = np.zeros(len(COMBOS))
+    strengths[live] = (below + level / 2) / max(len(hands) - 1, 1)
+    return strengths
+
+
+class RangeTracker():
+    '''
+    The opponent's range for one round, with the strength of every hand on the current street.
+    Call reset at the start of a round, advance when the board changes and observe_* for each opponent action.
+    '''
+
+    def __init__(self, preflop_strengths):
+        self.preflop_strengths = preflop_strengths
+        self.reset([])
+
+    def reset(self, hole):
+        '''
+        Starts a new round: every hand not holding one of our hole cards is equally likely.
+        '''
+        self.range = Range()
+        self.range.remove_cards(hole)
+        self.strengths = self.preflop_strengths
+        self.street = 0
+
+    def remove_cards(self, cards):
+        '''
+        Drops the hands holding cards we can see, such as the board or our swapped in hole cards.
+        '''
+        self.range.remove_cards(cards)
+        self.normalize()
+
+    def normalize(self):
+        total = self.range.weights.sum()
+        if total > 0:
+            self.range.weights /= total
+
+    def update(self, likelihood):
+        '''
+        Multiplies every weight by the probability of the observed action with that hand.
+        '''
+        self.range.weights *= likelihood
+        self.normalize()
+
+    def observe_bet(self, bet_ratio):
+        '''
+        The opponent bet or raised bet_ratio times the pot. Bigger bets come from stronger hands.
+        '''
+        self.update(_likelihood(self.strengths, min(0.9, 0.45 + 0.2 * bet_ratio)))
+
+    def observe_check(self):
+        '''
+        The opponent checked, which strong hands rarely do.
+        '''
+        self.update(_likelihood(self.strengths, _CHECK_THRESHOLD, stronger=False))
+
+    def observe_call(self, pot_odds):
+        '''
+        The opponent called a bet that gave them pot_odds, so their hand is probably worth at least that.
+        '''
+        self.update(_likelihood(self.strengths, pot_odds))
+
+    def observe_swap(self, percent):
+        '''
+        Spreads the range over the swaps the opponent may have made: each of their cards is replaced by an unseen card
+        with probability percent. A hand is kept whole, rebuilt from one kept card plus a fresh card,
+        or dealt fresh, and the one card cases only need each card's marginal weight.
+        '''
+        if percent <= 0:
+            return
+        weights = self.range.weights
+        live = self.range.live
+        unseen = np.count_nonzero(np.bincount(COMBOS[live].ravel(), minlength=52))  # cards the opponent could draw
+        if unseen < 2:
+            return
+        marginals = np.bincount(COMBOS.ravel(), weights=np.repeat(weights, 2), minlength=52)  # chance they hold each card
+        kept = (1 - percent) ** 2 * weights
+        one_swapped = percent * (1 - percent) * (marginals[COMBOS[:, 0]] + marginals[COMBOS[:, 1]]) / unseen
+        both_swapped = percent ** 2 * 2 / (unseen * (unseen - 1))
+        self.range.weights = np.where(live, kept + one_swapped + both_swapped, 0.)
+        self.normalize()
+
+    def advance(self, street, board, swap_percents):
+        '''
+        Moves to a new street: applies the swaps dealt before it (one probability per swap, in order)
+        and rescores the range on the new board.
+        '''
+        self.range.remove_cards(board)
+        for percent in swap_percents:
+            self.observe_swap(percent)
+        self.strengths = made_hand_strengths(board, self.range.live)
+        self.street = street
@@ -0,0 +1,108 @@
+'''
+A content-hashed cache of pokerbot builds.
+A build is skipped when the bot's build command and source files hash the same as at its last successful build
+and every file that build produced is still in place. The stamp lives in the bot's directory.
+'''
+import fnmatch
+import hashlib
+import json
+import os
+import fcntl
+
+STAMP_FILENAME = '.build_cache.json'
+# never part of the source hash, in addition to whatever the last build produced and the bot's "build_ignore" list
+IGNORE = ['.git', '__pycache__', '*.pyc', '*.class', 'build', STAMP_FILENAME]
+
+
+def scan(path):
+    '''
+    Returns the size and modification time of every file under path, keyed by relative path.
+    '''
+    files = {}
+    for directory, _, names in os.walk(path):
+        for name in names:
+            full_name = os.path.join(directory, name)
+            try:
+                stat = os.stat(full_name)
+            except OSError:
+                continue
+            files[os.path.relpath(full_name, path)] = [stat.st_size, stat.st_mtime_ns]
+    return files
+
+
+class BuildCache():
+    '''
+    Holds the build lock for one bot directory, so concurrent engines never build the same bot at once.
+    Use as a context manager around the build: if fresh() is true the build can be skipped,
+    otherwise call store() after it succeeds.
+    '''
+
+    def __init__(self, path, command, ignore=()):
+        self.path = path
+        self.command = command
+        self.ignore = IGNORE + list(ignore)
+        self.stamp_file = None
+        self.stamp = {}
+        self.before = {}
+
+    def __enter__(self):
+        self.stamp_file = open(os.path.join(self.path, STAMP_FILENAME), 'a+')
+        fcntl.flock(self.stamp_file, fcntl.LOCK_EX)
+        self.stamp_file.seek(0)
+        try:
+            self.stamp = json.load(self.stamp_file)
+        except ValueError:
+            self.stamp = {}
+        self.before = scan(self.path)
+        return self
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self.stamp_file, fcntl.LOCK_UN)
+        self.stamp_file.close()
+
+    def ignored(self, name, artifacts):
+        '''
+        Returns whether a file is left out of the source hash.
+        '''
+        return name in artifacts or any(fnmatch.fnmatch(part, pattern)
+                                        for part in name.split(os.sep) for pattern in self.ignore)
+
+    def digest(self, files, artifacts):
+        '''
+        Hashes the build command and the contents of every source file.
+        '''
+        digest = hashlib.sha256(json.dumps(self.command).encode())
+        for name in sorted(files):
+            if self.ignored(name, artifacts):
+                continue
+            digest.update(name.encode() + b'\0')
+            try:
+                with open(os.path.join(self.path, name), 'rb') as source_file:
+                    digest.update(hashlib.sha256(source_file.read()).digest())
+            except OSError:
+                pass
+        return digest.hexdigest()
+
+    def fresh(self):
+        '''
+        Returns whether the last successful build is still valid.
+        '''
+        artifacts = self.stamp.get('artifacts', {})
+        if self.stamp.get('digest') != self.digest(self.before, artifacts):
+            return False
+        return all(self.before.get(name) == stat for name, stat in artifacts.items())
+
+    def store(self):
+        '''
+        Records a successful build: the files it wrote or left in place from the last build, and the source hash.
+        '''
+        after = scan(self.path)
+        previous = self.stamp.get('artifacts', {})
+        artifacts = {name: stat for name, stat in after.items()
+                     if self.before.get(name) != stat or name in previous}
+        artifacts.pop(STAMP_FILENAME, None)
+        self.stamp = {'digest': self.digest(after, artifacts), 'artifacts': artifacts}
+        self.stamp_file.seek(0)
+        self.stamp_file.truncate()
+        json.dump(self.stamp, self.stamp_file)
+        self.stamp_file.flush()
@@ -7,13 +7,47 @@ PLAYER_2_NAME = 'B'
 PLAYER_2_PATH = './potodds_skeleton'
 # GAME PROGRESS IS RECORDED HERE
 GAME_LOG_FILENAME = 'gamelog'
-# PLAYER_LOG_SIZE_LIMIT IS IN BYTES
+# GAME_LOG_LEVEL IS 'off', 'summary' (ROUND RESULTS AND ERRORS) OR 'full' (EVERY ACTION)
+GAME_LOG_LEVEL = 'full'
+# COMPRESSED GAME LOGS ARE WRITTEN WITH GZIP TO GAME_LOG_FILENAME.txt.gz
+GAME_LOG_COMPRESS = False
+# A BINARY RECORD OF EVERY ROUND IS WRITTEN TO HAND_HISTORY_FILENAME.bin, None TURNS IT OFF
+HAND_HISTORY_FILENAME = 'handhistory'
+# EVERY DECISION'S RESPONSE TIME IS WRITTEN TO LATENCY_FILENAME.csv, WITH HISTOGRAMS IN LATENCY_FILENAME.json
+LATENCY_FILENAME = 'latency'
+# PLAYER_LOG_SIZE_LIMIT IS IN BYTES, THE LAST QUARTER OF IT KEEPS THE END OF THE OUTPUT
 PLAYER_LOG_SIZE_LIMIT = 524288
+# BUILD_CACHE SKIPS A BOT'S BUILD WHEN ITS SOURCES AND BUILD COMMAND ARE UNCHANGED SINCE ITS LAST SUCCESSFUL BUILD
+BUILD_CACHE = True
 # STARTING_GAME_CLOCK AND TIMEOUTS ARE IN SECONDS
 ENFORCE_GAME_CLOCK = True
 STARTING_GAME_CLOCK = 30.
 BUILD_TIMEOUT = 10.
 CONNECT_TIMEOUT = 10.
+# TRANSPORT IS 'tcp', 'unix' (A UNIX DOMAIN SOCKET) OR 'socketpair' (INHERITED BY THE BOT PROCESS)
+# 'unix' AND 'socketpair' ARE OPT IN AND LOWER LATENCY; BOTS WHOSE commands.json DOES NOT LIST TRANSPORT UNDER "transports" USE 'tcp'
+TRANSPORT = 'tcp'
+# WIRE_PROTOCOL IS 'text' OR 'binary' (PROTOCOL V2, SEE protocol.py), WHICH IS OFFERED TO EVERY SUBPROCESS BOT
+# ON CONNECTING; BOTS WHOSE RUNNER DOES NOT ANSWER THE OFFER STAY ON 'text'
+WIRE_PROTOCOL = 'text'
+# python3 engine.py PLAYS NUM_GAMES GAMES IN A ROW, LOGGING EACH TO ITS OWN gameN DIRECTORY IF MORE THAN ONE
+# BOTS WITH "reusable": true IN commands.json KEEP RUNNING BETWEEN GAMES
+NUM_GAMES = 1
+# DEAL_SEED SEEDS THE CARDS AND SWAPS OF THE FIRST GAME, EACH LATER GAME ADDS ONE; None DEALS FROM THE GLOBAL RANDOM STATE
+DEAL_SEED = None
+# DUPLICATE PLAYS EVERY GAME TWICE WITH THE SAME DEALS AND THE SEATS EXCHANGED, AND REPORTS THE PAIRED SCORE
+DUPLICATE = False
+# EARLY_STOPPING ENDS THE GAMES ONCE A SEQUENTIAL TEST DECIDES WHETHER PLAYER 1 WINS MORE THAN SPRT_THRESHOLD CHIPS
+# PER ROUND, TELLING IT APART FROM A WIN RATE SPRT_MARGIN AWAY WITH ERROR RATES SPRT_ALPHA AND SPRT_BETA
+# NUM_GAMES * NUM_ROUNDS CAPS THE ROUNDS PLAYED
+EARLY_STOPPING = False
+SPRT_THRESHOLD = 0.
+SPRT_MARGIN = 1.
+SPRT_ALPHA = 0.05
+SPRT_BETA = 0.05
+SPRT_MIN_ROUNDS = 100
+# HEADLESS RUNS PYTHON BOTS INSIDE THE ENGINE PROCESS, WITHOUT SOCKETS OR SUBPROCESSES
+HEADLESS = False
 # THE GAME VARIANT FIXES THE PARAMETERS BELOW
 # CHANGE ONLY FOR TRAINING OR EXPERIMENTATION
 FLOP_PERCENT = 0.1
@@ -1,13 +1,17 @@
 #pragma once
 
 #include <charconv>
+#include <cstdint>
 #include <iostream>
 #include <optional>
 #include <string>
+#include <type_traits>
 #include <utility>
+#include <vector>
 
 #include <boost/algorithm/string.hpp>
 #include <boost/asio/ip/tcp.hpp>
+#include <boost/asio/local/stream_protocol.hpp>
 
 #include <fmt/format.h>
 #include <fmt/ostream.h>
@@ -19,18 +23,106 @@
 
 namespace pokerbots::skeleton {
 
+// the engine offers wire protocol v2 with this message: big endian length prefixed frames of clauses
+// with integer arguments, and cards coded as 4 * rank + suit (see protocol.py in the engine)
+inline const std::string HELLO = "V2";
+
+// decodes one binary frame's payload into the clauses of the text protocol
+inline std::vector<std::string> decodePacket(std::vector<std::uint8_t> const& payload) {
+  auto card = [&](std::size_t i) {
+    return std::string{"23456789TJQKA"[payload[i] / 4], "cdhs"[payload[i] % 4]};
+  };
+  auto uint16 = [&](std::size_t i) { return (payload[i] << 8) | payload[i + 1]; };
+  std::vector<std::string> packet;
+  std::size_t i = 0;
+  while (i < payload.size()) {
+    char code = static_cast<char>(payload[i++]);
+    switch (code) {
+      case 'T': {
+        std::uint32_t clock = (std::uint32_t(uint16(i)) << 16) | std::uint32_t(uint16(i + 2));
+        packet.push_back(fmt::format(FMT_STRING("T{}"), clock / 1000.0));
+        i += 4;
+        break;
+      }
+      case 'P': {
+        packet.push_back(fmt::format(FMT_STRING("P{}"), int(payload[i])));
+        i += 1;
+        break;
+      }
+      case 'H':
+      case 'U':
+      case 'O': {
+        packet.push_back(code + card(i) + ',' + card(i + 1));
+        i += 2;
+        break;
+      }
+      case 'B': {
+        std::size_t count = payload[i++];
+        std::string clause = "B";
+        for (std::size_t j = 0; j < count; ++j) {
+          clause += (j > 0 ? "," : "") + card(i + j);
+        }
+        packet.push_back(std::move(clause));
+        i += count;
+        break;
+      }
+      case 'R': {
+        packet.push_back(fmt::format(FMT_STRING("R{}"), uint16(i)));
+        i += 2;
+        break;
+      }
+      case 'D': {
+        packet.push_back(fmt::format(FMT_STRING("D{}"), static_cast<std::int16_t>(uint16(i))));
+        i += 2;
+        break;
+      }
+      default: {
+        packet.push_back(std::string(1, code));
+        break;
+      }
+    }
+  }
+  return packet;
+}
+
 template <typename BotType> class Runner {
 private:
   BotType pokerbot;
-  boost::asio::ip::tcp::iostream &stream;
+  std::iostream &stream;
+  bool binary = false;
 
   template <typename Action> void send(Action const& action) {
     std::string code;
     code = fmt::format(FMT_STRING("{}"), action);
-    stream << fmt::format(FMT_STRING("{}"), code) << '\n';
+    write(code);
+  }
+
+  void write(std::string const& code) {
+    if (binary) {
+      std::string payload(1, code[0]);
+      if (code[0] == 'R') {
+        auto amount = std::stoi(code.substr(1));
+        payload += static_cast<char>(amount >> 8);
+        payload += static_cast<char>(amount & 0xff);
+      }
+      std::string frame{static_cast<char>(payload.size() >> 8), static_cast<char>(payload.size() & 0xff)};
+      stream << frame + payload;
+    } else {
+      stream << code << '\n';
+    }
   }
 
   std::vector<std::string> receive() {
+    if (binary) {
+      std::uint8_t header[2];
+      stream.read(reinterpret_cast<char *>(header), 2);
+      std::vector<std::uint8_t> payload((header[0] << 8) | header[1]);
+      stream.read(reinterpret_cast<char *>(payload.data()), payload.size());
+      if (!stream) {
+        return {"Q"};
+      }
+      return decodePacket(payload);
+    }
     std::string line;
     std::getline(stream, line);
     boost::algorithm::trim(line);
@@ -42,11 +134,9 @@ private:
 
 public:
   template <typename... Args>
-  Runner(boost::asio::ip::tcp::iostream &stream, Args... args)
+  Runner(std::iostream &stream, Args... args)
       : pokerbot(std::forward<Args>(args)...), stream(stream) {}
 
-  ~Runner() { stream.close(); }
-
   void run() {
     GameInfoPtr gameInfo = std::make_shared<GameInfo>(0, 0.0, 1);
     StatePtr roundState = std::make_shared<RoundState>(
@@ -57,6 +147,12 @@ public:
     bool roundFlag = true;
     while (true) {
       auto packet = receive();
+      if (packet.size() == 1 && packet[0] == HELLO) {
+        // the engine offers wire protocol v2: agree in text, then switch
+        write(HELLO);
+        binary = true;
+        continue;
+      }
       for (const auto &clause : packet) {
         auto leftover = clause.substr(1);
         switch (clause[0]) {
@@ -163,6 +259,19 @@ public:
             roundFlag = true;
             break;
           }
+          case 'N': {
+            // a new game in the same process: start a fresh bot, keeping whatever its statics already loaded
+            if constexpr (std::is_default_constructible_v<BotType> && std::is_move_assignable_v<BotType>) {
+              pokerbot = BotType();
+            } else {
+              // no way to start a fresh bot, so quit without acking and the engine starts a new process instead
+              return;
+            }
+            gameInfo = std::make_shared<GameInfo>(0, 0.0, 1);
+            active = 0;
+            roundFlag = true;
+            break;
+          }
           case 'Q': {
             return;
           }
@@ -183,6 +292,26 @@ public:
 
 template <typename BotType, typename... Args>
 void runBot(std::string &host, std::string &port, Args... args) {
+  // port may also be unix:PATH for a Unix domain socket or fd:N for a socket inherited from the engine
+  if (port.rfind("unix:", 0) == 0 || port.rfind("fd:", 0) == 0) {
+    boost::asio::local::stream_protocol::iostream stream;
+    if (port.rfind("unix:", 0) == 0) {
+      stream.connect(boost::asio::local::stream_protocol::endpoint(port.substr(5)));
+    } else {
+      stream.socket().assign(boost::asio::local::stream_protocol(), std::stoi(port.substr(3)));
+      // tell the engine we are ready, as there was no connection for it to wait on
+      stream << "K\n" << std::flush;
+    }
+    if (!stream) {
+      fmt::print(std::cerr, FMT_STRING("Unable to connect to {}"), port);
+      return;
+    }
+
+    auto r = Runner<BotType>(stream, std::forward<Args>(args)...);
+    r.run();
+    return;
+  }
+
   boost::asio::ip::tcp::iostream stream;
   stream.connect(host, port);
   // set TCP_NODELAY on the stream
@@ -199,7 +328,7 @@ void runBot(std::string &host, std::string &port, Args... args) {
 
 inline std::array<std::string, 2> parseArgs(int argc, char *argv[]) {
   std::string host = "localhost";
-  int port;
+  std::string port;
 
   bool host_flag = false;
   for (int i = 1; i < argc; i++) {
@@ -212,11 +341,11 @@ inline std::array<std::string, 2> parseArgs(int argc, char *argv[]) {
       host = arg;
       host_flag = false;
     } else {
-      port = std::stoi(arg);
+      port = arg;
     }
   }
 
-  return {host, std::to_string(port)};
+  return {host, port};
 }
 
 } // namespace pokerbots::skeleton
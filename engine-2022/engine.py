@@ -2,9 +2,15 @@
 6.176 MIT POKERBOTS GAME ENGINE
 DO NOT REMOVE, RENAME, OR EDIT THIS FILE
 '''
-from collections import namedtuple
-from threading import Thread
-from queue import Queue
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, Lock
+import contextlib
+import tempfile
+import shutil
+import gzip
+import importlib.util
+import traceback
 import time
 import json
 import subprocess
@@ -16,6 +22,11 @@ import random
 
 sys.path.append(os.getcwd())
 from config import *
+from hand_history import HandHistoryWriter, FOLD, CALL, CHECK, RAISE
+from latency import LatencyRecorder
+from build_cache import BuildCache
+from protocol import HELLO, encode_packet, read_frame, decode_response
+from stats import RunningStats, SequentialTest
 
 FoldAction = namedtuple('FoldAction', [])
 CallAction = namedtuple('CallAction', [])
@@ -26,6 +37,7 @@ TerminalState = namedtuple('TerminalState', ['deltas', 'previous_state'])
 
 STREET_NAMES = ['Flop', 'Turn', 'River']
 DECODE = {'F': FoldAction, 'C': CallAction, 'K': CheckAction, 'R': RaiseAction}
+LEGAL_CODES = lambda actions: ''.join(code for code, action in DECODE.items() if action in actions)
 CCARDS = lambda cards: ','.join(map(str, cards))
 PCARDS = lambda cards: '[{}]'.format(' '.join(map(str, cards)))
 PVALUE = lambda name, value: ', {} ({})'.format(name, value)
@@ -47,35 +59,39 @@ STATUS = lambda players: ''.join([PVALUE(p.name, p.bankroll) for p in players])
 # Q game over
 #
 # Clauses are separated by spaces
-# Messages end with '\n'
+# Messages are newline terminated, unless the pokerbot agreed to wire protocol v2 (see protocol.py)
 # The engine expects a response of K at the end of the round as an ack,
 # otherwise a response which encodes the player's action
 # Action history is sent once, including the player's actions
 
 
-def swap(player_card_index, hands, deck):
-    '''
-    Swaps player's card with a card from the deck.
-    '''
-    card_index = player_card_index % len(hands)
-    player_index = player_card_index // len(hands)
-    random_card = deck.deal(1)
-    deck.cards.append(hands[player_index][card_index])
-    hands[player_index][card_index] = random_card[0]
-    return hands, deck
-
-
-class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks', 'hands', 'deck', 'previous_state'])):
+class RoundState():
     '''
     Encodes the game tree for one round of poker.
+    The round's shuffled deck and swap draws are shared by every state in the round; each state only keeps
+    the index of the next card to deal, so advancing a street never copies the deck.
     '''
+    __slots__ = ('button', 'street', 'pips', 'stacks', 'hands', 'board', 'deck', 'swaps', 'next_card',
+                 'previous_state')
+
+    def __init__(self, button, street, pips, stacks, hands, board, deck, swaps, next_card, previous_state):
+        self.button = button
+        self.street = street
+        self.pips = pips  # tuples indexed by player, like stacks
+        self.stacks = stacks
+        self.hands = hands
+        self.board = board
+        self.deck = deck  # a tuple of all 52 cards in dealing order
+        self.swaps = swaps  # the round's 8 swap draws, see DealStream.deal
+        self.next_card = next_card
+        self.previous_state = previous_state
 
     def showdown(self):
         '''
         Compares the players' hands and computes payoffs.
         '''
-        score0 = eval7.evaluate(self.deck[0] + self.hands[0])
-        score1 = eval7.evaluate(self.deck[0] + self.hands[1])
+        score0 = eval7.evaluate(self.board + self.hands[0])
+        score1 = eval7.evaluate(self.board + self.hands[1])
         if score0 > score1:
             delta = STARTING_STACK - self.stacks[1]
         elif score0 < score1:
@@ -109,6 +125,16 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks'
         min_contribution = min(max_contribution, continue_cost + max(continue_cost, BIG_BLIND))
         return (self.pips[active] + min_contribution, self.pips[active] + max_contribution)
             
+    def contribute(self, active, contribution):
+        '''
+        Returns the pips and stacks after the active player puts contribution more chips in the pot.
+        '''
+        if active == 0:
+            return ((self.pips[0] + contribution, self.pips[1]),
+                    (self.stacks[0] - contribution, self.stacks[1]))
+        return ((self.pips[0], self.pips[1] + contribution),
+                (self.stacks[0], self.stacks[1] - contribution))
+
     def proceed_street(self):
         '''
         Resets the players' pips and advances the game tree to the next round of betting.
@@ -116,15 +142,23 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks'
         if self.street == 5:
             return self.showdown()
         new_street = 3 if self.street == 0 else self.street + 1
-        new_hands = self.hands.copy()
-        new_deck = eval7.Deck()
-        new_deck.cards = self.deck[1].cards.copy()
+        new_hands = self.hands
+        next_card = self.next_card
         if self.street == 0 or self.street == 3:
-            for i in range(sum([len(hand) for hand in self.hands])):
-                if random.random() < (FLOP_PERCENT if self.street == 0 else TURN_PERCENT):
-                    new_hands, new_deck = swap(i, new_hands, new_deck)
-        board = self.deck[0] + new_deck.deal(3 if self.street == 0 else 1)
-        return RoundState(1, new_street, [0, 0], self.stacks, new_hands, (board, new_deck), self)
+            percent = FLOP_PERCENT if self.street == 0 else TURN_PERCENT
+            draws = self.swaps[:4] if self.street == 0 else self.swaps[4:]
+            for i in range(4):
+                if draws[i] < percent:
+                    # the swapped out card never comes back, so the replacement is simply the next card
+                    player_index, card_index = divmod(i, 2)
+                    hand = list(new_hands[player_index])
+                    hand[card_index] = self.deck[next_card]
+                    next_card += 1
+                    new_hands = new_hands[:player_index] + (hand,) + new_hands[player_index + 1:]
+        count = 3 if self.street == 0 else 1
+        board = self.board + list(self.deck[next_card:next_card + count])
+        return RoundState(1, new_street, (0, 0), self.stacks, new_hands, board,
+                          self.deck, self.swaps, next_card + count, self)
 
     def proceed(self, action):
         '''
@@ -136,27 +170,47 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks'
             return TerminalState([delta, -delta], self)
         if isinstance(action, CallAction):
             if self.button == 0:  # sb calls bb
-                return RoundState(1, 0, [BIG_BLIND] * 2, [STARTING_STACK - BIG_BLIND] * 2, self.hands, self.deck, self)
+                return RoundState(1, 0, (BIG_BLIND, BIG_BLIND), (STARTING_STACK - BIG_BLIND, STARTING_STACK - BIG_BLIND),
+                                  self.hands, self.board, self.deck, self.swaps, self.next_card, self)
             # both players acted
-            new_pips = list(self.pips)
-            new_stacks = list(self.stacks)
-            contribution = new_pips[1-active] - new_pips[active]
-            new_stacks[active] -= contribution
-            new_pips[active] += contribution
-            state = RoundState(self.button + 1, self.street, new_pips, new_stacks, self.hands, self.deck, self)
+            contribution = self.pips[1-active] - self.pips[active]
+            new_pips, new_stacks = self.contribute(active, contribution)
+            state = RoundState(self.button + 1, self.street, new_pips, new_stacks,
+                               self.hands, self.board, self.deck, self.swaps, self.next_card, self)
             return state.proceed_street()
         if isinstance(action, CheckAction):
             if (self.street == 0 and self.button > 0) or self.button > 1:  # both players acted
                 return self.proceed_street()
             # let opponent act
-            return RoundState(self.button + 1, self.street, self.pips, self.stacks, self.hands, self.deck, self)
+            return RoundState(self.button + 1, self.street, self.pips, self.stacks,
+                              self.hands, self.board, self.deck, self.swaps, self.next_card, self)
         # isinstance(action, RaiseAction)
-        new_pips = list(self.pips)
-        new_stacks = list(self.stacks)
-        contribution = action.amount - new_pips[active]
-        new_stacks[active] -= contribution
-        new_pips[active] += contribution
-        return RoundState(self.button + 1, self.street, new_pips, new_stacks, self.hands, self.deck, self)
+        contribution = action.amount - self.pips[active]
+        new_pips, new_stacks = self.contribute(active, contribution)
+        return RoundState(self.button + 1, self.street, new_pips, new_stacks,
+                          self.hands, self.board, self.deck, self.swaps, self.next_card, self)
+
+
+class DealStream():
+    '''
+    Deals every round's deck and swap draws from one random number generator.
+    Games dealt from streams with the same seed see the same cards and swaps round by round whatever the players do,
+    so a deal can be replayed with the seats exchanged.
+    '''
+
+    def __init__(self, seed=None):
+        # without a seed, deal from the global random state like eval7.Deck().shuffle()
+        self.rng = random if seed is None else random.Random(seed)
+        self.cards = eval7.Deck().cards
+
+    def deal(self):
+        '''
+        Returns the next round's deck, a tuple of 52 cards in dealing order, and its swap draws:
+        a uniform for each of the four hole cards before the flop, then four more before the turn.
+        '''
+        deck = list(self.cards)
+        self.rng.shuffle(deck)
+        return tuple(deck), tuple(self.rng.random() for _ in range(8))
 
 
 class Player():
@@ -164,19 +218,22 @@ class Player():
     Handles subprocess and socket interactions with one player's pokerbot.
     '''
 
-    def __init__(self, name, path):
+    def __init__(self, name, path, log_dir='.'):
         self.name = name
         self.path = path
+        self.log_dir = log_dir
         self.game_clock = STARTING_GAME_CLOCK
         self.bankroll = 0
+        self.latency = None
         self.commands = None
         self.bot_subprocess = None
         self.socketfile = None
-        self.bytes_queue = Queue()
+        self.binary = False
+        self.bot_log = BotLog(os.path.join(log_dir, name + '.txt'))
 
-    def build(self):
+    def load_commands(self):
         '''
-        Loads the commands file and builds the pokerbot.
+        Loads the commands file.
         '''
         try:
             with open(self.path + '/commands.json', 'r') as json_file:
@@ -192,60 +249,147 @@ class Player():
         except json.decoder.JSONDecodeError:
             print(self.path)
             print(self.name, 'commands.json misformatted')
+
+    def build(self):
+        '''
+        Loads the commands file and builds the pokerbot.
+        '''
+        self.load_commands()
         if self.commands is not None and len(self.commands['build']) > 0:
             try:
-                proc = subprocess.run(self.commands['build'],
-                                      stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                                      cwd=self.path, timeout=BUILD_TIMEOUT, check=False)
-                self.bytes_queue.put(proc.stdout)
-            except subprocess.TimeoutExpired as timeout_expired:
-                error_message = 'Timed out waiting for ' + self.name + ' to build'
-                print(error_message)
-                self.bytes_queue.put(timeout_expired.stdout)
-                self.bytes_queue.put(error_message.encode())
+                if BUILD_CACHE:
+                    with BuildCache(self.path, self.commands['build'], self.commands.get('build_ignore', [])) as cache:
+                        if cache.fresh():
+                            print(self.name, 'build is up to date')
+                        elif self.run_build():
+                            cache.store()
+                else:
+                    self.run_build()
             except (TypeError, ValueError):
                 print(self.name, 'build command misformatted')
             except OSError:
                 print(self.name, 'build failed - check "build" in commands.json')
 
+    def run_build(self):
+        '''
+        Runs the build command and returns whether it succeeded.
+        '''
+        try:
+            proc = subprocess.run(self.commands['build'],
+                                  stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                  cwd=self.path, timeout=BUILD_TIMEOUT, check=False)
+            self.bot_log.write(proc.stdout)
+            return proc.returncode == 0
+        except subprocess.TimeoutExpired as timeout_expired:
+            error_message = 'Timed out waiting for ' + self.name + ' to build'
+            print(error_message)
+            self.bot_log.write(timeout_expired.stdout)
+            self.bot_log.write(error_message.encode())
+            return False
+
+    def transport(self):
+        '''
+        Returns TRANSPORT if the pokerbot's commands.json lists it under "transports", otherwise 'tcp'.
+        '''
+        return TRANSPORT if TRANSPORT in self.commands.get('transports', ['tcp']) else 'tcp'
+
+    def listen(self, transport):
+        '''
+        Binds a server socket for the pokerbot to connect to.
+        Returns the socket and the address argument: a port for 'tcp' or unix:PATH for 'unix'.
+        '''
+        if transport == 'unix':
+            path = os.path.join(tempfile.mkdtemp(prefix='pokerbots-'), self.name + '.sock')
+            server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server_socket.bind(path)
+            return server_socket, 'unix:' + path
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_socket.bind(('', 0))
+        return server_socket, str(server_socket.getsockname()[1])
+
+    @staticmethod
+    def unlisten(address):
+        '''
+        Removes the socket file behind a unix:PATH address once the pokerbot has connected.
+        '''
+        if address.startswith('unix:'):
+            shutil.rmtree(os.path.dirname(address[5:]), ignore_errors=True)
+
+    def launch(self, address, pass_fds=()):
+        '''
+        Starts the pokerbot with the address of its engine connection as the last argument.
+        '''
+        proc = subprocess.Popen(self.commands['run'] + [address],
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                cwd=self.path, pass_fds=pass_fds)
+        self.bot_subprocess = proc
+        # function for bot listening, looking up bot_log for every line so a reused bot logs to its current game
+        def enqueue_output(out):
+            try:
+                for line in out:
+                    self.bot_log.write(line)
+            except ValueError:
+                pass
+        # start a separate bot listening thread which dies with the program
+        Thread(target=enqueue_output, args=(proc.stdout,), daemon=True).start()
+
+    def connect(self, client_socket, transport):
+        '''
+        Wraps the pokerbot's end of the connection for line based messaging.
+        '''
+        with client_socket:
+            client_socket.settimeout(CONNECT_TIMEOUT)
+            if transport == 'tcp':
+                # every message waits for a reply, so never hold back small writes
+                client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock = client_socket.makefile('rwb')
+            self.socketfile = sock
+
+    def negotiate(self):
+        '''
+        Offers the pokerbot wire protocol v2 if WIRE_PROTOCOL is 'binary'.
+        Runners that speak it answer the hello in kind; older ones ack it with K and stay on text.
+        '''
+        if WIRE_PROTOCOL == 'binary':
+            self.binary = self.request([HELLO]) == HELLO
+
     def run(self):
         '''
-        Runs the pokerbot and establishes the socket connection.
+        Runs the pokerbot and establishes the socket connection over the transport it supports.
         '''
         if self.commands is not None and len(self.commands['run']) > 0:
+            transport = self.transport()
             try:
-                server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                with server_socket:
-                    server_socket.bind(('', 0))
-                    server_socket.settimeout(CONNECT_TIMEOUT)
-                    server_socket.listen()
-                    port = server_socket.getsockname()[1]
-                    proc = subprocess.Popen(self.commands['run'] + [str(port)],
-                                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                                            cwd=self.path)
-                    self.bot_subprocess = proc
-                    # function for bot listening
-                    def enqueue_output(out, queue):
-                        try:
-                            for line in out:
-                                queue.put(line)
-                        except ValueError:
-                            pass
-                    # start a separate bot listening thread which dies with the program
-                    Thread(target=enqueue_output, args=(proc.stdout, self.bytes_queue), daemon=True).start()
-                    # block until we timeout or the player connects
-                    client_socket, _ = server_socket.accept()
-                    with client_socket:
-                        client_socket.settimeout(CONNECT_TIMEOUT)
-                        sock = client_socket.makefile('rw')
-                        self.socketfile = sock
-                        print(self.name, 'connected successfully')
+                if transport == 'socketpair':
+                    engine_socket, bot_socket = socket.socketpair()
+                    with bot_socket:
+                        self.launch('fd:' + str(bot_socket.fileno()), (bot_socket.fileno(),))
+                    self.connect(engine_socket, transport)
+                    # there is no connection to wait for, so the pokerbot acks once it is ready
+                    if self.socketfile.readline().strip() != b'K':
+                        self.socketfile = None
+                        raise ConnectionError
+                else:
+                    server_socket, address = self.listen(transport)
+                    try:
+                        with server_socket:
+                            server_socket.settimeout(CONNECT_TIMEOUT)
+                            server_socket.listen()
+                            self.launch(address)
+                            # block until we timeout or the player connects
+                            client_socket, _ = server_socket.accept()
+                            self.connect(client_socket, transport)
+                    finally:
+                        self.unlisten(address)
+                self.negotiate()
+                print(self.name, 'connected successfully over', transport, 'in binary' if self.binary else 'in text')
             except (TypeError, ValueError):
                 print(self.name, 'run command misformatted')
-            except OSError:
-                print(self.name, 'run failed - check "run" in commands.json')
             except socket.timeout:
+                self.socketfile = None
                 print('Timed out waiting for', self.name, 'to connect')
+            except OSError:
+                print(self.name, 'run failed - check "run" in commands.json')
 
     def stop(self):
         '''
@@ -253,7 +397,7 @@ class Player():
         '''
         if self.socketfile is not None:
             try:
-                self.socketfile.write('Q\n')
+                self.socketfile.write(encode_packet(['Q']) if self.binary else b'Q\n')
                 self.socketfile.close()
             except socket.timeout:
                 print('Timed out waiting for', self.name, 'to disconnect')
@@ -262,21 +406,66 @@ class Player():
         if self.bot_subprocess is not None:
             try:
                 outs, _ = self.bot_subprocess.communicate(timeout=CONNECT_TIMEOUT)
-                self.bytes_queue.put(outs)
+                self.bot_log.write(outs)
             except subprocess.TimeoutExpired:
                 print('Timed out waiting for', self.name, 'to quit')
                 self.bot_subprocess.kill()
                 outs, _ = self.bot_subprocess.communicate()
-                self.bytes_queue.put(outs)
-        with open(self.name + '.txt', 'wb') as log_file:
-            bytes_written = 0
-            for output in self.bytes_queue.queue:
-                try:
-                    bytes_written += log_file.write(output)
-                    if bytes_written >= PLAYER_LOG_SIZE_LIMIT:
-                        break
-                except TypeError:
-                    pass
+                self.bot_log.write(outs)
+        self.write_log()
+
+    def write_log(self):
+        '''
+        Finishes the pokerbot's log file for this game.
+        '''
+        self.bot_log.close()
+
+    def connected(self):
+        '''
+        Returns whether the pokerbot can be queried.
+        '''
+        return self.socketfile is not None
+
+    def reusable(self):
+        '''
+        Returns whether the pokerbot's commands.json promises it can play another game in the same process.
+        '''
+        return self.commands is not None and self.commands.get('reusable') is True
+
+    def reset(self, name, log_dir):
+        '''
+        Readies a running pokerbot for a new game under name, writing its log to log_dir.
+        '''
+        self.name = name
+        self.log_dir = log_dir
+        self.game_clock = STARTING_GAME_CLOCK
+        self.bankroll = 0
+        self.latency = None
+        self.bot_log = BotLog(os.path.join(log_dir, name + '.txt'))
+
+    def new_game(self):
+        '''
+        Tells a running pokerbot that a new game is starting. Returns whether it acknowledged.
+        The pokerbot's Runner answers N by starting a fresh Bot, which is not charged to the game clock.
+        '''
+        if not self.connected():
+            return False
+        try:
+            return self.request(['N']) == 'K'
+        except OSError:
+            return False
+
+    def request(self, packet):
+        '''
+        Sends one message to the pokerbot and returns its response clause.
+        '''
+        if self.binary:
+            self.socketfile.write(encode_packet(packet))
+            self.socketfile.flush()
+            return decode_response(read_frame(self.socketfile))
+        self.socketfile.write((' '.join(packet) + '\n').encode())
+        self.socketfile.flush()
+        return self.socketfile.readline().decode().strip()
 
     def query(self, round_state, player_message, game_log):
         '''
@@ -284,53 +473,375 @@ class Player():
         At the end of the round, we request a CheckAction from the pokerbot.
         '''
         legal_actions = round_state.legal_actions() if isinstance(round_state, RoundState) else {CheckAction}
-        if self.socketfile is not None and self.game_clock > 0.:
+        self.latency = None  # unless the pokerbot is asked, there is no round trip to record
+        if self.connected() and self.game_clock > 0.:
             clause = ''
             try:
-                player_message[0] = 'T{:.3f}'.format(self.game_clock)
-                message = ' '.join(player_message) + '\n'
-                del player_message[1:]  # do not send redundant action history
+                packet = self.packet(player_message)
                 start_time = time.perf_counter()
-                self.socketfile.write(message)
-                self.socketfile.flush()
-                clause = self.socketfile.readline().strip()
-                end_time = time.perf_counter()
-                if ENFORCE_GAME_CLOCK:
-                    self.game_clock -= end_time - start_time
-                if self.game_clock <= 0.:
-                    raise socket.timeout
-                action = DECODE[clause[0]]
-                if action in legal_actions:
-                    if clause[0] == 'R':
-                        amount = int(clause[1:])
-                        min_raise, max_raise = round_state.raise_bounds()
-                        if min_raise <= amount <= max_raise:
-                            return action(amount)
-                    else:
-                        return action()
-                game_log.append(self.name + ' attempted illegal ' + action.__name__)
-            except socket.timeout:
-                error_message = self.name + ' ran out of time'
-                game_log.append(error_message)
-                print(error_message)
-                self.game_clock = 0.
-            except OSError:
-                error_message = self.name + ' disconnected'
-                game_log.append(error_message)
-                print(error_message)
-                self.game_clock = 0.
-            except (IndexError, KeyError, ValueError):
-                game_log.append(self.name + ' response misformatted: ' + str(clause))
+                clause = self.request(packet)
+                action = self.decode(clause, time.perf_counter() - start_time, round_state, legal_actions, game_log)
+                if action is not None:
+                    return action
+            except (OSError, IndexError, KeyError, ValueError) as error:
+                self.fail(error, clause, game_log)
         return CheckAction() if CheckAction in legal_actions else FoldAction()
 
+    def packet(self, player_message):
+        '''
+        Stamps the game clock on the pending message and returns it for sending.
+        '''
+        player_message[0] = 'T{:.3f}'.format(self.game_clock)
+        packet = player_message.copy()
+        del player_message[1:]  # do not send redundant action history
+        return packet
+
+    def decode(self, clause, elapsed, round_state, legal_actions, game_log):
+        '''
+        Charges elapsed seconds to the game clock and returns the action in the response clause,
+        or None if the action is illegal. Raises socket.timeout if the clock ran out.
+        '''
+        self.latency = elapsed
+        if ENFORCE_GAME_CLOCK:
+            self.game_clock -= elapsed
+        if self.game_clock <= 0.:
+            raise socket.timeout
+        action = DECODE[clause[0]]
+        if action in legal_actions:
+            if clause[0] == 'R':
+                amount = int(clause[1:])
+                min_raise, max_raise = round_state.raise_bounds()
+                if min_raise <= amount <= max_raise:
+                    return action(amount)
+            else:
+                return action()
+        game_log.append(self.name + ' attempted illegal ' + action.__name__)
+        return None
+
+    def fail(self, error, clause, game_log):
+        '''
+        Logs a failed query. Timeouts and disconnections end the pokerbot's game.
+        '''
+        if isinstance(error, socket.timeout):
+            error_message = self.name + ' ran out of time'
+        elif isinstance(error, OSError):
+            error_message = self.name + ' disconnected'
+        else:  # IndexError, KeyError or ValueError
+            game_log.append(self.name + ' response misformatted: ' + str(clause))
+            return
+        game_log.append(error_message)
+        print(error_message)
+        self.game_clock = 0.
+
+
+def is_local_module(module, path):
+    '''
+    Returns whether a module was imported from inside the directory at path.
+    '''
+    locations = [getattr(module, '__file__', None)] + list(getattr(module, '__path__', []))
+    return any(location and os.path.abspath(location).startswith(path + os.sep) for location in locations)
+
+
+class InProcessPlayer(Player):
+    '''
+    Drives a Python pokerbot inside the engine process, without sockets or subprocesses.
+    '''
+
+    def __init__(self, name, path, log_dir='.'):
+        super().__init__(name, path, log_dir)
+        self.runner = None
+
+    def build(self):
+        '''
+        Loads the commands file. Python pokerbots have nothing to build.
+        '''
+        self.load_commands()
+
+    def run(self):
+        '''
+        Imports the pokerbot's script and wraps it in its own skeleton Runner.
+        '''
+        if self.commands is None:
+            return
+        scripts = [arg for arg in self.commands['run'] if isinstance(arg, str) and arg.endswith('.py')]
+        if not scripts:
+            print(self.name, 'run command has no python script - headless mode needs a python bot')
+            return
+        path = os.path.abspath(self.path)
+        cwd = os.getcwd()
+        modules = set(sys.modules)
+        sys.path.insert(0, path)
+        try:
+            # the pokerbot may load files relative to its own directory while it starts
+            os.chdir(path)
+            spec = importlib.util.spec_from_file_location('pokerbot_' + self.name, os.path.join(path, scripts[0]))
+            module = importlib.util.module_from_spec(spec)
+            with contextlib.redirect_stdout(self.bot_log):
+                spec.loader.exec_module(module)
+                pokerbot = module.Player()
+            self.runner = sys.modules['skeleton.runner'].Runner(pokerbot, None)
+            print(self.name, 'loaded successfully')
+        except Exception:  # pylint: disable=broad-except
+            traceback.print_exc(file=self.bot_log)
+            print(self.name, 'failed to load - check "run" in commands.json')
+        finally:
+            os.chdir(cwd)
+            sys.path.remove(path)
+            # forget the pokerbot's own modules so the opponent imports its copies
+            for module_name in set(sys.modules) - modules:
+                if is_local_module(sys.modules[module_name], path):
+                    del sys.modules[module_name]
+
+    def new_game(self):
+        '''
+        Starts a fresh Bot in the loaded pokerbot, from the pokerbot's own directory like the first one.
+        '''
+        cwd = os.getcwd()
+        try:
+            os.chdir(self.path)
+            return super().new_game()
+        finally:
+            os.chdir(cwd)
+
+    def connected(self):
+        '''
+        Returns whether the pokerbot can be queried.
+        '''
+        return self.runner is not None
+
+    def request(self, packet):
+        '''
+        Hands one message to the pokerbot's Runner and returns its response clause.
+        '''
+        try:
+            with contextlib.redirect_stdout(self.bot_log):
+                action = self.runner.respond(packet)
+        except Exception as exception:  # pylint: disable=broad-except
+            traceback.print_exc(file=self.bot_log)
+            self.runner = None
+            raise OSError from exception
+        return self.runner.encode(action)
+
+
+class BotPool():
+    '''
+    Keeps pokerbots running between consecutive games, so each one is built and started once.
+    Only pokerbots whose commands.json sets "reusable": true are kept; the rest are stopped after every game.
+    '''
+
+    def __init__(self, headless=HEADLESS):
+        self.player_class = InProcessPlayer if headless else Player
+        self.idle = {}
+
+    def acquire(self, name, path, log_dir):
+        '''
+        Returns a running pokerbot from path for a new game, reusing an idle one if it acknowledges the new game.
+        '''
+        idle = self.idle.get(path, [])
+        while idle:
+            player = idle.pop()
+            player.reset(name, log_dir)
+            if player.new_game():
+                print(name, 'reused from the previous game')
+                return player
+            player.stop()
+        player = self.player_class(name, path, log_dir)
+        player.build()
+        player.run()
+        return player
+
+    def acquire_all(self, names, paths, log_dir):
+        '''
+        Acquires a pokerbot for every seat, building and starting subprocess pokerbots at the same time.
+        In process pokerbots load one at a time, since loading changes the working directory.
+        '''
+        if self.player_class is InProcessPlayer:
+            return [self.acquire(name, path, log_dir) for name, path in zip(names, paths)]
+        with ThreadPoolExecutor(len(names)) as executor:
+            return list(executor.map(self.acquire, names, paths, [log_dir] * len(names)))
+
+    def release(self, player):
+        '''
+        Takes a pokerbot back at the end of a game, writing its log and keeping it running if it is reusable.
+        '''
+        if player.reusable() and player.connected():
+            player.write_log()
+            self.idle.setdefault(player.path, []).append(player)
+        else:
+            player.stop()
+
+    def close(self):
+        '''
+        Stops every idle pokerbot.
+        '''
+        for players in self.idle.values():
+            for player in players:
+                player.stop()
+        self.idle = {}
+
+
+class BotLog():
+    '''
+    Streams a pokerbot's output to its log file in batched writes, keeping the file within PLAYER_LOG_SIZE_LIMIT.
+    The first part of the limit is written as the output arrives; past it, only a ring of the most recent output
+    is kept in memory and written after a marker when the log is closed, so the start and the end both survive.
+    Takes bytes or text, so it can also stand in for stdout.
+    '''
+
+    def __init__(self, name, limit=PLAYER_LOG_SIZE_LIMIT, batch_size=65536):
+        self.name = name
+        self.tail_limit = limit // 4
+        self.head_limit = limit - self.tail_limit
+        self.batch_size = batch_size
+        self.written = 0
+        self.batch = []
+        self.batch_bytes = 0
+        self.tail = deque()
+        self.tail_bytes = 0
+        self.skipped = 0
+        self.closed = False
+        self.log_file = None
+        self.lock = Lock()  # the output thread and the engine both write
+
+    def write(self, data):
+        '''
+        Adds output to the log. Ignored once the log is closed.
+        '''
+        if not data:
+            return
+        if isinstance(data, str):
+            data = data.encode()
+        with self.lock:
+            if self.closed:
+                return
+            room = self.head_limit - self.written - self.batch_bytes
+            if room > 0:
+                self.batch.append(data[:room])
+                self.batch_bytes += len(self.batch[-1])
+                if self.batch_bytes >= self.batch_size:
+                    self.write_batch()
+                data = data[room:]
+            if data:
+                self.tail.append(data)
+                self.tail_bytes += len(data)
+                while self.tail_bytes - len(self.tail[0]) >= self.tail_limit:
+                    dropped = self.tail.popleft()
+                    self.tail_bytes -= len(dropped)
+                    self.skipped += len(dropped)
+
+    def flush(self):
+        '''
+        Writes out the batched output.
+        '''
+        with self.lock:
+            if not self.closed:
+                self.write_batch()
+
+    def write_batch(self):
+        '''
+        Writes the batch to the file, opening it on the first write. Call with the lock held.
+        '''
+        if self.log_file is None:
+            self.log_file = open(self.name, 'wb')
+        self.log_file.write(b''.join(self.batch))
+        self.written += self.batch_bytes
+        self.batch = []
+        self.batch_bytes = 0
+
+    def close(self):
+        '''
+        Writes out the batched output and the tail, then closes the file.
+        '''
+        with self.lock:
+            if self.closed:
+                return
+            tail = b''.join(self.tail)
+            if len(tail) > self.tail_limit:
+                self.skipped += len(tail) - self.tail_limit
+                tail = tail[-self.tail_limit:]
+            if self.skipped:
+                self.batch.append('\n[{} bytes skipped]\n'.format(self.skipped).encode())
+            self.batch.append(tail)
+            self.write_batch()
+            self.log_file.close()
+            self.closed = True
+
+
+class GameLog():
+    '''
+    Streams the game log to disk in buffered batches of lines, optionally gzip compressed.
+    At the 'off' level nothing is written; at 'summary' only round headers, errors and the final result;
+    at 'full' every blind, deal, action and showdown.
+    '''
+
+    def __init__(self, name, level=GAME_LOG_LEVEL, compress=GAME_LOG_COMPRESS, buffer_size=1000):
+        if level not in ('off', 'summary', 'full'):
+            raise ValueError('unknown game log level ' + repr(level))
+        self.name = name + '.gz' if compress else name
+        self.summary = level != 'off'
+        self.full = level == 'full'
+        self.buffer_size = buffer_size
+        self.lines = []
+        self.started = False
+        self.log_file = None
+        if self.summary:
+            self.log_file = gzip.open(self.name, 'wt') if compress else open(self.name, 'w')
+
+    def append(self, line):
+        '''
+        Adds one line, writing out the buffer once it is full. Ignored at the 'off' level.
+        '''
+        if self.summary:
+            self.lines.append(line)
+            if len(self.lines) >= self.buffer_size:
+                self.flush()
+
+    def flush(self):
+        '''
+        Writes out the buffered lines.
+        '''
+        if self.lines:
+            # lines are separated, not terminated, by newlines
+            self.log_file.write(('\n' if self.started else '') + '\n'.join(self.lines))
+            self.started = True
+            self.lines = []
+
+    def close(self):
+        '''
+        Writes out the remaining lines and closes the file.
+        '''
+        if self.log_file is not None:
+            self.flush()
+            self.log_file.close()
+            self.log_file = None
+
 
 class Game():
     '''
     Manages logging and the high-level game procedure.
     '''
 
-    def __init__(self):
-        self.log = ['6.176 MIT Pokerbots - ' + PLAYER_1_NAME + ' vs ' + PLAYER_2_NAME]
+    def __init__(self, names=(PLAYER_1_NAME, PLAYER_2_NAME), paths=(PLAYER_1_PATH, PLAYER_2_PATH),
+                 num_rounds=NUM_ROUNDS, log_dir='.', headless=HEADLESS,
+                 log_level=GAME_LOG_LEVEL, log_compress=GAME_LOG_COMPRESS, pool=None, seed=None,
+                 test=None, test_entrant=0):
+        self.names = names
+        self.paths = paths
+        self.num_rounds = num_rounds
+        self.log_dir = log_dir
+        self.headless = headless
+        self.log_level = log_level
+        self.log_compress = log_compress
+        self.pool = pool
+        self.deals = DealStream(seed)
+        # a SequentialTest fed each round's delta for entrant test_entrant, ending the game once it decides
+        self.test = test
+        self.test_entrant = test_entrant
+        self.log = None
+        self.history = None
+        self.latencies = None
+        self.round_num = 0
+        self.entrants = []
         self.player_messages = [[], []]
 
     def log_round_state(self, players, round_state):
@@ -338,23 +849,26 @@ class Game():
         Incorporates RoundState information into the game log and player messages.
         '''
         if round_state.street == 0 and round_state.button == 0:
-            self.log.append('{} posts the blind of {}'.format(players[0].name, SMALL_BLIND))
-            self.log.append('{} posts the blind of {}'.format(players[1].name, BIG_BLIND))
-            self.log.append('{} dealt {}'.format(players[0].name, PCARDS(round_state.hands[0])))
-            self.log.append('{} dealt {}'.format(players[1].name, PCARDS(round_state.hands[1])))
+            if self.log.full:
+                self.log.append('{} posts the blind of {}'.format(players[0].name, SMALL_BLIND))
+                self.log.append('{} posts the blind of {}'.format(players[1].name, BIG_BLIND))
+                self.log.append('{} dealt {}'.format(players[0].name, PCARDS(round_state.hands[0])))
+                self.log.append('{} dealt {}'.format(players[1].name, PCARDS(round_state.hands[1])))
             self.player_messages[0] = ['T0.', 'P0', 'H' + CCARDS(round_state.hands[0])]
             self.player_messages[1] = ['T0.', 'P1', 'H' + CCARDS(round_state.hands[1])]
         elif round_state.street > 0 and round_state.button == 1:
-            board = round_state.deck[0]
-            self.log.append(STREET_NAMES[round_state.street - 3] + ' ' + PCARDS(board) +
-                            PVALUE(players[0].name, STARTING_STACK-round_state.stacks[0]) +
-                            PVALUE(players[1].name, STARTING_STACK-round_state.stacks[1]))
+            board = round_state.board
+            if self.log.full:
+                self.log.append(STREET_NAMES[round_state.street - 3] + ' ' + PCARDS(board) +
+                                PVALUE(players[0].name, STARTING_STACK-round_state.stacks[0]) +
+                                PVALUE(players[1].name, STARTING_STACK-round_state.stacks[1]))
             compressed_board = 'B' + CCARDS(board)
             self.player_messages[0].append(compressed_board)
             self.player_messages[1].append(compressed_board)
             if round_state.street < 5:
-                self.log.append("{}'s hand: {}".format(players[0].name, PCARDS(round_state.hands[0])))
-                self.log.append("{}'s hand: {}".format(players[1].name, PCARDS(round_state.hands[1])))
+                if self.log.full:
+                    self.log.append("{}'s hand: {}".format(players[0].name, PCARDS(round_state.hands[0])))
+                    self.log.append("{}'s hand: {}".format(players[1].name, PCARDS(round_state.hands[1])))
                 self.player_messages[0].append('U' + CCARDS(round_state.hands[0]))
                 self.player_messages[1].append('U' + CCARDS(round_state.hands[1]))
 
@@ -372,9 +886,10 @@ class Game():
             phrasing = ' checks'
             code = 'K'
         else:  # isinstance(action, RaiseAction)
-            phrasing = (' bets ' if bet_override else ' raises to ') + str(action.amount)
             code = 'R' + str(action.amount)
-        self.log.append(name + phrasing)
+            phrasing = (' bets ' if bet_override else ' raises to ') + code[1:]
+        if self.log.full:
+            self.log.append(name + phrasing)
         self.player_messages[0].append(code)
         self.player_messages[1].append(code)
 
@@ -384,42 +899,93 @@ class Game():
         '''
         previous_state = round_state.previous_state
         if FoldAction not in previous_state.legal_actions():
-            self.log.append('{} shows {}'.format(players[0].name, PCARDS(previous_state.hands[0])))
-            self.log.append('{} shows {}'.format(players[1].name, PCARDS(previous_state.hands[1])))
+            if self.log.full:
+                self.log.append('{} shows {}'.format(players[0].name, PCARDS(previous_state.hands[0])))
+                self.log.append('{} shows {}'.format(players[1].name, PCARDS(previous_state.hands[1])))
             self.player_messages[0].append('O' + CCARDS(previous_state.hands[1]))
             self.player_messages[1].append('O' + CCARDS(previous_state.hands[0]))
-        self.log.append('{} awarded {}'.format(players[0].name, round_state.deltas[0]))
-        self.log.append('{} awarded {}'.format(players[1].name, round_state.deltas[1]))
+        if self.log.full:
+            self.log.append('{} awarded {}'.format(players[0].name, round_state.deltas[0]))
+            self.log.append('{} awarded {}'.format(players[1].name, round_state.deltas[1]))
         self.player_messages[0].append('D' + str(round_state.deltas[0]))
         self.player_messages[1].append('D' + str(round_state.deltas[1]))
 
+    def deal_round(self):
+        '''
+        Deals a new deck and returns the first state of a round.
+        '''
+        deck, swaps = self.deals.deal()
+        hands = (list(deck[0:2]), list(deck[2:4]))
+        pips = (SMALL_BLIND, BIG_BLIND)
+        stacks = (STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND)
+        return RoundState(0, 0, pips, stacks, hands, [], deck, swaps, 4, None)
+
     def run_round(self, players):
         '''
         Runs one round of poker.
         '''
-        deck = eval7.Deck()
-        deck.shuffle()
-        deck = ([], deck)
-        hands = [deck[1].deal(2), deck[1].deal(2)]
-        pips = [SMALL_BLIND, BIG_BLIND]
-        stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
-        round_state = RoundState(0, 0, pips, stacks, hands, deck, None)
+        round_state = self.deal_round()
+        actions = []
         while not isinstance(round_state, TerminalState):
             self.log_round_state(players, round_state)
             active = round_state.button % 2
             player = players[active]
             action = player.query(round_state, self.player_messages[active], self.log)
-            bet_override = (round_state.pips == [0, 0])
-            self.log_action(player.name, action, bet_override)
-            round_state = round_state.proceed(action)
-        self.log_terminal_state(players, round_state)
+            round_state = self.apply_action(player, round_state, action, actions)
+        self.finish_round(players, round_state, actions)
         for player, player_message, delta in zip(players, self.player_messages, round_state.deltas):
             player.query(round_state, player_message, self.log)
-            player.bankroll += delta
+            self.settle(player, delta)
+
+    def apply_action(self, player, round_state, action, actions):
+        '''
+        Logs and records the active player's action and returns the next state.
+        '''
+        if self.latencies is not None:
+            self.latencies.record(self.round_num, player.name, round_state.street,
+                                  LEGAL_CODES(round_state.legal_actions()), player.latency)
+        bet_override = (round_state.pips == (0, 0))
+        self.log_action(player.name, action, bet_override)
+        actions.append((round_state.street, round_state.button % 2, action, player.latency))
+        return round_state.proceed(action)
+
+    def finish_round(self, players, terminal_state, actions):
+        '''
+        Logs the end of a round and adds it to the hand history.
+        '''
+        self.log_terminal_state(players, terminal_state)
+        if self.history is not None:
+            self.record_round(players, terminal_state, actions)
+
+    def settle(self, player, delta):
+        '''
+        Records a player's end of round acknowledgement and pays out their delta.
+        '''
+        if self.latencies is not None:
+            self.latencies.record(self.round_num, player.name, None, 'K', player.latency)
+        player.bankroll += delta
+
+    def record_round(self, players, terminal_state, actions):
+        '''
+        Adds a finished round to the hand history.
+        '''
+        final_state = terminal_state.previous_state
+        hands = {}
+        state = final_state
+        while state is not None:  # the earliest state of each street holds the hands after that street's swaps
+            hands[state.street] = state.hands
+            state = state.previous_state
+        codes = {FoldAction: FOLD, CallAction: CALL, CheckAction: CHECK, RaiseAction: RAISE}
+        self.history.record(self.entrants.index(players[0]),
+                            [hands[street] for street in (0, 3, 4) if street in hands],
+                            final_state.board, final_state.street,
+                            FoldAction not in final_state.legal_actions(), terminal_state.deltas,
+                            [(codes[type(action)], street, seat, getattr(action, 'amount', 0), latency)
+                             for street, seat, action, latency in actions])
 
     def run(self):
         '''
-        Runs one game of poker.
+        Runs one game of poker and returns the players' final bankrolls.
         '''
         print('   __  _____________  ___       __           __        __    ')
         print('  /  |/  /  _/_  __/ / _ \\___  / /_____ ____/ /  ___  / /____')
@@ -427,27 +993,132 @@ class Game():
         print('/_/  /_/___/ /_/   /_/   \\___/_/\\_\\\\__/_/ /_.__/\\___/\\__/___/')
         print()
         print('Starting the Pokerbots engine...')
-        players = [
-            Player(PLAYER_1_NAME, PLAYER_1_PATH),
-            Player(PLAYER_2_NAME, PLAYER_2_PATH)
-        ]
+        # pokerbots come from the shared pool if there is one, so reusable bots keep running between games
+        pool = self.pool if self.pool is not None else BotPool(self.headless)
+        players = pool.acquire_all(self.names, self.paths, self.log_dir)
+        self.open_records(players)
+        self.start_rounds()
+        for round_num in range(1, self.num_rounds + 1):
+            self.start_round(round_num, players)
+            bankroll = self.entrants[self.test_entrant].bankroll
+            self.run_round(players)
+            players = players[::-1]
+            if self.test_decided(bankroll):
+                break
+        self.end_rounds(players)
         for player in players:
-            player.build()
-            player.run()
-        for round_num in range(1, NUM_ROUNDS + 1):
+            pool.release(player)
+        if self.pool is None:
+            pool.close()
+        self.close_records()
+        return [player.bankroll for player in self.entrants]
+
+    def open_records(self, players):
+        '''
+        Opens the game log and hand history for a match between players.
+        '''
+        self.entrants = list(players)
+        self.log = GameLog(os.path.join(self.log_dir, GAME_LOG_FILENAME + '.txt'), self.log_level, self.log_compress)
+        self.log.append('6.176 MIT Pokerbots - ' + self.names[0] + ' vs ' + self.names[1])
+        if HAND_HISTORY_FILENAME is not None:
+            self.history = HandHistoryWriter(os.path.join(self.log_dir, HAND_HISTORY_FILENAME + '.bin'), self.names)
+
+    def start_rounds(self):
+        '''
+        Starts timing once the pokerbots are running.
+        '''
+        if LATENCY_FILENAME is not None:
+            self.latencies = LatencyRecorder(os.path.join(self.log_dir, LATENCY_FILENAME))
+
+    def start_round(self, round_num, players):
+        '''
+        Logs the start of a round.
+        '''
+        self.round_num = round_num
+        if self.log.summary:
             self.log.append('')
             self.log.append('Round #' + str(round_num) + STATUS(players))
-            self.run_round(players)
-            players = players[::-1]
+
+    def test_decided(self, bankroll):
+        '''
+        Feeds the round's delta to the sequential test and returns whether the test has decided.
+        bankroll is the tested entrant's bankroll before the round.
+        '''
+        if self.test is None or self.test.add(self.entrants[self.test_entrant].bankroll - bankroll) is None:
+            return False
+        self.log.append('')
+        self.log.append('Stopped after round {}: {} wins {} than {} per round'.format(
+            self.round_num, self.names[self.test_entrant], 'more' if self.test.decision == 'above' else 'less',
+            self.test.threshold))
+        return True
+
+    def end_rounds(self, players):
+        '''
+        Logs the final bankrolls and writes the latency summary.
+        '''
         self.log.append('')
         self.log.append('Final' + STATUS(players))
-        for player in players:
-            player.stop()
-        name = GAME_LOG_FILENAME + '.txt'
-        print('Writing', name)
-        with open(name, 'w') as log_file:
-            log_file.write('\n'.join(self.log))
+        if self.latencies is not None:
+            timing = self.latencies.close()
+            print('Time spent: engine {:.3f}s,'.format(timing['engine']),
+                  ', '.join('{} {:.3f}s'.format(name, seconds) for name, seconds in timing['bots'].items()))
+            print('Writing', self.latencies.name + '.json')
+
+    def close_records(self):
+        '''
+        Writes out and closes the game log and hand history.
+        '''
+        if self.log.summary:
+            print('Writing', self.log.name)
+        self.log.close()
+        if self.history is not None:
+            print('Writing', self.history.name)
+            self.history.close()
+
+
+def main():
+    '''
+    Plays NUM_GAMES games between the configured players, each twice with the seats exchanged if DUPLICATE is set.
+    With EARLY_STOPPING the games stop as soon as a sequential test decides how PLAYER_1 compares to SPRT_THRESHOLD.
+    '''
+    names = (PLAYER_1_NAME, PLAYER_2_NAME)
+    paths = (PLAYER_1_PATH, PLAYER_2_PATH)
+    first_seed = DEAL_SEED
+    if DUPLICATE and first_seed is None:  # both plays of a deal need the same stream
+        first_seed = random.randrange(2 ** 32)
+    games = []
+    for game_num in range(1, NUM_GAMES + 1):
+        seed = None if first_seed is None else first_seed + game_num - 1
+        games.append(('game' + str(game_num), False, seed))
+        if DUPLICATE:
+            games.append(('game' + str(game_num) + '-swapped', True, seed))
+    scores = RunningStats()
+    test = None
+    if EARLY_STOPPING:
+        test = SequentialTest(SPRT_THRESHOLD, SPRT_MARGIN, SPRT_ALPHA, SPRT_BETA, SPRT_MIN_ROUNDS)
+    with contextlib.closing(BotPool()) as bot_pool:
+        for game_dir, swapped, seed in games:
+            if len(games) == 1:
+                game_dir = '.'
+            os.makedirs(game_dir, exist_ok=True)
+            order = slice(None, None, -1 if swapped else 1)
+            bankrolls = Game(names[order], paths[order], log_dir=game_dir, pool=bot_pool, seed=seed,
+                             test=test, test_entrant=int(swapped)).run()
+            if swapped:  # PLAYER_1's score for the deal is its bankroll from both seats
+                scores.add(first_bankroll + bankrolls[1])
+            first_bankroll = bankrolls[0]
+            if test is not None and test.decision is not None:
+                break
+    if DUPLICATE:
+        print()
+        print('Duplicate score for {} over {} deals: {:.1f} per deal, stderr {:.1f}'.format(
+            PLAYER_1_NAME, scores.count, scores.mean, scores.stderr()))
+    if test is not None:
+        verdict = {'above': 'wins more than', 'below': 'wins less than', None: 'is undecided against'}[test.decision]
+        print()
+        print('After {} rounds {} {} {} per round: {:.2f} per round, stderr {:.2f}'.format(
+            test.stats.count, PLAYER_1_NAME, verdict, SPRT_THRESHOLD, test.stats.mean, test.stats.stderr()))
 
 
 if __name__ == '__main__':
-    Game().run()
+    main()
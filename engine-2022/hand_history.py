@@ -0,0 +1,349 @@
+'''
+Compact binary hand histories written by the engine, one fixed-layout record per round.
+
+A file starts with a header (magic, version, record size, round count per block and the entrants' names
+as JSON), followed by zlib compressed blocks. Each block is a little endian uint32 compressed size and
+uint32 record count, then the compressed records. Records use the RECORD_FORMAT layout below.
+
+Cards are 4 * rank + suit, with ranks 2 through A as 0 through 12 and suits c, d, h, s as 0 through 3;
+NO_CARD fills cards that were never dealt. Seats are 0 for the small blind and 1 for the big blind,
+and first names the entrant sitting in seat 0. Each action is one byte: the action type in bits 0-1,
+the betting round (preflop, flop, turn, river) in bits 2-3 and the acting seat in bit 4.
+
+HandHistoryReader memory-maps a file and answers filtered queries from a side index of per-round
+summaries, which is saved next to the file. Reading needs NumPy; writing only needs the standard library.
+'''
+import struct
+import json
+import mmap
+import zlib
+import math
+import os
+
+try:
+    import numpy as np
+except ImportError:  # the engine only writes hand histories
+    np = None
+
+MAGIC = b'PBHH'
+VERSION = 1
+HEADER_FORMAT = '<4sHHIH'  # magic, version, record size, records per block, length of the names JSON
+BLOCK_FORMAT = '<II'  # compressed size, record count
+MAX_ACTIONS = 32  # longer rounds keep their first MAX_ACTIONS actions and set TRUNCATED
+NO_CARD = 255
+
+RANKS = '23456789TJQKA'
+SUITS = 'cdhs'
+CARD_CODES = {rank + suit: 4 * i + j for i, rank in enumerate(RANKS) for j, suit in enumerate(SUITS)}
+CARD_NAMES = {code: name for name, code in CARD_CODES.items()}
+
+FOLD, CALL, CHECK, RAISE = range(4)
+ACTION_NAMES = 'FCKR'
+STREET_INDEX = {0: 0, 3: 1, 4: 2, 5: 3}
+STREETS = (0, 3, 4, 5)
+
+# flags
+SHOWDOWN = 1
+TRUNCATED = 2
+
+RECORD_FIELDS = [
+    ('round', 'I'),  # round number, from 1
+    ('first', 'B'),  # entrant index in seat 0
+    ('flags', 'B'),
+    ('street', 'B'),  # last street reached, 0, 3, 4 or 5
+    ('num_actions', 'B'),
+    ('deltas', '2h'),  # by seat
+    ('hands', '12B'),  # both seats' hole cards preflop, on the flop and on the turn
+    ('swaps', 'B'),  # bit 4 * swap + card, for swaps before the flop (0) or turn (1) of cards 0-3 (seat 0, then seat 1)
+    ('board', '5B'),
+    ('actions', '{}B'.format(MAX_ACTIONS)),
+    ('amounts', '{}H'.format(MAX_ACTIONS)),  # raise to amount, 0 for other actions
+    ('latencies', '{}f'.format(MAX_ACTIONS)),  # seconds the acting bot took to respond
+]
+RECORD_FORMAT = '<' + ''.join(code for _, code in RECORD_FIELDS)
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+SEQUENCE_LENGTH = MAX_ACTIONS + 3  # action letters with a / between streets
+
+
+def encode_cards(cards, size):
+    '''
+    Encodes cards (eval7 Cards or strings) as a list of size card codes, padded with NO_CARD.
+    '''
+    codes = [CARD_CODES[str(card)] for card in cards]
+    return codes + [NO_CARD] * (size - len(codes))
+
+
+def encode_action(code, street, seat):
+    '''
+    Packs an action type, the street it was taken on and the acting seat into one byte.
+    '''
+    return code | (STREET_INDEX[street] << 2) | (seat << 4)
+
+
+def decode_action(action):
+    '''
+    Unpacks an action byte into its type, street and acting seat.
+    '''
+    return action & 3, STREETS[(action >> 2) & 3], (action >> 4) & 1
+
+
+class HandHistoryWriter():
+    '''
+    Buffers round records and writes them out in compressed blocks.
+    '''
+
+    def __init__(self, name, names, block_size=4096, level=6):
+        self.name = name
+        self.block_size = block_size
+        self.level = level
+        self.records = []
+        self.rounds = 0
+        names = json.dumps(list(names)).encode()
+        self.history_file = open(name, 'wb')
+        self.history_file.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, RECORD_SIZE, block_size, len(names)))
+        self.history_file.write(names)
+
+    def record(self, first, hands, board, street, showdown, deltas, actions):
+        '''
+        Adds one round. hands lists both seats' hole cards for each street up to the turn that was dealt,
+        board is the final board and actions lists (code, street, seat, amount, latency) tuples in order.
+        A latency of None, for a pokerbot that was not asked, is stored as NaN.
+        '''
+        self.rounds += 1
+        hand_codes = []
+        for seats in hands[:3]:
+            hand_codes += encode_cards(list(seats[0]) + list(seats[1]), 4)
+        hand_codes += [NO_CARD] * (12 - len(hand_codes))
+        swaps = 0
+        for swap in range(2):
+            for card in range(4):
+                after = hand_codes[4 * (swap + 1) + card]
+                if after != NO_CARD and after != hand_codes[4 * swap + card]:
+                    swaps |= 1 << (4 * swap + card)
+        flags = (SHOWDOWN if showdown else 0) | (TRUNCATED if len(actions) > MAX_ACTIONS else 0)
+        actions = actions[:MAX_ACTIONS]
+        padding = [0] * (MAX_ACTIONS - len(actions))
+        self.records.append(struct.pack(
+            RECORD_FORMAT, self.rounds, first, flags, street, len(actions), *deltas, *hand_codes, swaps,
+            *encode_cards(board, 5),
+            *([encode_action(code, action_street, seat) for code, action_street, seat, _, _ in actions] + padding),
+            *([amount for _, _, _, amount, _ in actions] + padding),
+            *([math.nan if latency is None else latency for _, _, _, _, latency in actions] + padding)))
+        if len(self.records) >= self.block_size:
+            self.flush()
+
+    def flush(self):
+        '''
+        Compresses the buffered records into one block.
+        '''
+        if self.records:
+            data = zlib.compress(b''.join(self.records), self.level)
+            self.history_file.write(struct.pack(BLOCK_FORMAT, len(data), len(self.records)))
+            self.history_file.write(data)
+            self.records = []
+
+    def close(self):
+        '''
+        Writes out the last block and closes the file.
+        '''
+        if self.history_file is not None:
+            self.flush()
+            self.history_file.close()
+            self.history_file = None
+
+
+def record_dtype():
+    '''
+    The NumPy structured dtype matching RECORD_FORMAT, so decompressed blocks can be viewed without copying.
+    '''
+    dtype = np.dtype([('round', '<u4'), ('first', 'u1'), ('flags', 'u1'), ('street', 'u1'), ('num_actions', 'u1'),
+                      ('deltas', '<i2', (2,)), ('hands', 'u1', (12,)), ('swaps', 'u1'), ('board', 'u1', (5,)),
+                      ('actions', 'u1', (MAX_ACTIONS,)), ('amounts', '<u2', (MAX_ACTIONS,)),
+                      ('latencies', '<f4', (MAX_ACTIONS,))])
+    assert dtype.itemsize == RECORD_SIZE
+    return dtype
+
+
+def summarize(records, small_blind=1, big_blind=2):
+    '''
+    Builds the side index columns for an array of records: the final pot, bitmasks of who raised, called,
+    checked and folded on each street (bit 2 * street index + seat) and the action sequence as text.
+    '''
+    n = len(records)
+    rows = np.arange(n)
+    pips = np.tile(np.array([small_blind, big_blind]), (n, 1))
+    pot = np.zeros(n, dtype=np.int64)
+    current = np.zeros(n, dtype=np.int64)  # street index of the bets in pips
+    masks = {code: np.zeros(n, dtype=np.uint8) for code in range(4)}
+    letters = np.full((n, SEQUENCE_LENGTH), b' ', dtype='S1')
+    column = np.zeros(n, dtype=np.int64)
+    for i in range(MAX_ACTIONS):
+        valid = i < records['num_actions']
+        action = records['actions'][:, i].astype(np.int64)
+        code, street, seat = action & 3, (action >> 2) & 3, (action >> 4) & 1
+        moved = valid & (street != current)  # a new street, bets so far go in the pot
+        pot += np.where(moved, pips.sum(axis=1), 0)
+        pips[moved] = 0
+        for gap in range(3):  # one slash per street change, even when a street had no betting
+            slash = moved & (street - current > gap)
+            letters[rows[slash], column[slash]] = b'/'
+            column += slash
+        current = np.where(valid, street, current)
+        other = pips[rows, 1 - seat]
+        new_pip = np.where(code == RAISE, records['amounts'][:, i], np.where(code == CALL, other, pips[rows, seat]))
+        pips[rows[valid], seat[valid]] = new_pip[valid]
+        for action_code, mask in masks.items():
+            mask |= np.where(valid & (code == action_code), 1 << (2 * street + seat), 0).astype(np.uint8)
+        letters[rows[valid], column[valid]] = np.array(list(ACTION_NAMES), dtype='S1')[code[valid]]
+        column += valid
+    return {
+        'street': records['street'].copy(),
+        'showdown': (records['flags'] & SHOWDOWN) > 0,
+        'first': records['first'].copy(),
+        'swaps': records['swaps'].copy(),
+        'pot': pot + pips.sum(axis=1),
+        'folds': masks[FOLD], 'calls': masks[CALL], 'checks': masks[CHECK], 'raises': masks[RAISE],
+        'sequence': np.char.strip(letters.view('S{}'.format(SEQUENCE_LENGTH)).ravel()),
+    }
+
+
+class HandHistoryReader():
+    '''
+    Random access and filtered queries over a memory-mapped hand history.
+    Only the block headers are read up front; blocks are decompressed when their rounds are needed.
+    The side index is built on first use and saved as name + '.idx.npz'.
+    '''
+
+    def __init__(self, name):
+        if np is None:
+            raise ImportError('reading hand histories needs numpy')
+        self.name = name
+        with open(name, 'rb') as history_file:
+            self.data = mmap.mmap(history_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, self.block_size, names_length = struct.unpack_from(HEADER_FORMAT, self.data)
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            raise ValueError(name + ' is not a version {} hand history'.format(VERSION))
+        offset = struct.calcsize(HEADER_FORMAT)
+        self.names = json.loads(self.data[offset:offset + names_length].decode())
+        offset += names_length
+        self.dtype = record_dtype()
+        offsets, sizes, counts = [], [], []
+        while offset < len(self.data):
+            size, count = struct.unpack_from(BLOCK_FORMAT, self.data, offset)
+            offset += struct.calcsize(BLOCK_FORMAT)
+            offsets.append(offset)
+            sizes.append(size)
+            counts.append(count)
+            offset += size
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.sizes = np.array(sizes, dtype=np.int64)
+        self.starts = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)  # first round index of each block
+        self.cached_block = (None, None)
+        self.index = None
+
+    def __len__(self):
+        return int(self.starts[-1])
+
+    def close(self):
+        self.data.close()
+
+    def block(self, i):
+        '''
+        Returns the records of block i as a structured array. The last block read is kept.
+        '''
+        if self.cached_block[0] != i:
+            raw = zlib.decompress(self.data[self.offsets[i]:self.offsets[i] + self.sizes[i]])
+            self.cached_block = (i, np.frombuffer(raw, dtype=self.dtype))
+        return self.cached_block[1]
+
+    def __getitem__(self, i):
+        '''
+        Returns the record of the round at index i (round number i + 1).
+        '''
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        block = int(np.searchsorted(self.starts, i, 'right')) - 1
+        return self.block(block)[i - self.starts[block]]
+
+    def blocks(self):
+        '''
+        Yields every block's records in order.
+        '''
+        for i in range(len(self.offsets)):
+            yield self.block(i)
+
+    def load_index(self):
+        '''
+        Returns the side index, loading it from disk when it is newer than the hand history or building it otherwise.
+        '''
+        if self.index is None:
+            name = self.name + '.idx.npz'
+            if os.path.exists(name) and os.path.getmtime(name) >= os.path.getmtime(self.name):
+                with np.load(name) as index:
+                    self.index = dict(index)
+            if self.index is None or len(self.index['street']) != len(self):
+                columns = [summarize(block) for block in self.blocks()] or [summarize(np.empty(0, dtype=self.dtype))]
+                self.index = {key: np.concatenate([column[key] for column in columns]) for key in columns[0]}
+                np.savez(name, **self.index)
+        return self.index
+
+    def seats(self, player):
+        '''
+        Returns the seat of the named player (or entrant index) in every round.
+        '''
+        entrant = self.names.index(player) if isinstance(player, str) else player
+        return np.where(self.load_index()['first'] == entrant, 0, 1)
+
+    def acted(self, kind, player, street):
+        '''
+        Returns whether the player made an action of kind ('folds', 'calls', 'checks' or 'raises') on the street
+        (0, 3, 4 or 5) in every round.
+        '''
+        bits = 2 * STREET_INDEX[street] + self.seats(player)
+        return (self.load_index()[kind] >> bits) & 1 > 0
+
+    def swapped(self, player, street):
+        '''
+        Returns whether any of the player's cards were swapped just before the street (3 or 4) in every round.
+        '''
+        bits = 4 * (0 if street == 3 else 1) + 2 * self.seats(player)
+        return (self.load_index()['swaps'] >> bits) & 3 > 0
+
+    def select(self, street=None, showdown=None, pot=None, sequence=None, mask=None):
+        '''
+        Returns the indices of the rounds that reached street, went (or didn't go) to showdown,
+        had a final pot within the (low, high) bounds of pot and whose action sequence contains the text
+        sequence, such as 'RC/' for a called raise that closed the preflop betting. mask adds any other condition,
+        for example acted('raises', 'B', 5) & swapped('B', 3).
+        '''
+        index = self.load_index()
+        keep = np.ones(len(self), dtype=bool)
+        if street is not None:
+            keep &= index['street'] == street
+        if showdown is not None:
+            keep &= index['showdown'] == showdown
+        if pot is not None:
+            keep &= (index['pot'] >= pot[0]) & (index['pot'] <= pot[1])
+        if sequence is not None:
+            keep &= np.char.find(index['sequence'], sequence.encode()) >= 0
+        if mask is not None:
+            keep &= mask
+        return np.nonzero(keep)[0]
+
+    def rounds(self, indices):
+        '''
+        Yields the records of the given sorted round indices one block at a time, as structured arrays.
+        Blocks holding none of the rounds are never decompressed.
+        '''
+        indices = np.asarray(indices, dtype=np.int64)
+        bounds = np.searchsorted(indices, self.starts)
+        for i in range(len(self.offsets)):
+            if bounds[i] < bounds[i + 1]:
+                yield self.block(i)[indices[bounds[i]:bounds[i + 1]] - self.starts[i]]
+
+    def records(self, indices):
+        '''
+        Returns the records of the given sorted round indices as one structured array.
+        '''
+        parts = list(self.rounds(indices))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=self.dtype)
@@ -7,8 +7,19 @@ import java.util.Collections;
 import java.lang.Integer;
 import java.lang.String;
 import java.net.Socket;
+import java.net.SocketAddress;
+import java.nio.ByteBuffer;
+import java.nio.channels.Channels;
+import java.nio.channels.SocketChannel;
+import java.io.Closeable;
+import java.io.InputStream;
+import java.io.OutputStream;
 import java.io.PrintWriter;
 import java.io.BufferedReader;
+import java.io.BufferedInputStream;
+import java.io.BufferedOutputStream;
+import java.io.DataInputStream;
+import java.io.DataOutputStream;
 import java.io.InputStreamReader;
 import java.io.IOException;
 
@@ -16,25 +27,112 @@ import java.io.IOException;
  * Interacts with the engine.
  */
 public class Runner {
+    /**
+     * The engine offers wire protocol v2 with this message: big endian length prefixed frames of clauses
+     * with integer arguments, and cards coded as 4 * rank + suit (see protocol.py in the engine).
+     */
+    private static final String HELLO = "V2";
+    private static final String[] CARDS = new String[52];
+
+    static {
+        for (int i = 0; i < 52; i++) {
+            CARDS[i] = "" + "23456789TJQKA".charAt(i / 4) + "cdhs".charAt(i % 4);
+        }
+    }
+
     private String host;
-    private int port;
+    private String port;
     private Bot pokerbot;
-    private Socket socket;
+    private Closeable socket;
+    private InputStream rawInStream;
+    private OutputStream rawOutStream;
     private PrintWriter outStream;
     private BufferedReader inStream;
+    private DataOutputStream binaryOutStream;
+    private DataInputStream binaryInStream;
 
     /**
      * Returns an incoming message from the engine.
      */
     public String[] receive() throws IOException {
+        if (this.binaryInStream != null) {
+            byte[] payload = new byte[this.binaryInStream.readUnsignedShort()];
+            this.binaryInStream.readFully(payload);
+            return decodePacket(payload);
+        }
         String line = this.inStream.readLine().trim();
         return line.split(" ");
     }
 
+    /**
+     * Decodes one binary frame's payload into the clauses of the text protocol.
+     */
+    private static String[] decodePacket(byte[] payload) {
+        ByteBuffer buffer = ByteBuffer.wrap(payload);
+        List<String> packet = new ArrayList<String>();
+        while (buffer.hasRemaining()) {
+            char code = (char)buffer.get();
+            switch (code) {
+                case 'T': {
+                    packet.add("T" + Float.toString(buffer.getInt() / 1000.0f));
+                    break;
+                }
+                case 'P': {
+                    packet.add("P" + buffer.get());
+                    break;
+                }
+                case 'H':
+                case 'U':
+                case 'O': {
+                    packet.add(code + CARDS[buffer.get()] + "," + CARDS[buffer.get()]);
+                    break;
+                }
+                case 'B': {
+                    String[] cards = new String[buffer.get()];
+                    for (int i = 0; i < cards.length; i++) {
+                        cards[i] = CARDS[buffer.get()];
+                    }
+                    packet.add("B" + String.join(",", cards));
+                    break;
+                }
+                case 'R': {
+                    packet.add("R" + (buffer.getShort() & 0xffff));
+                    break;
+                }
+                case 'D': {
+                    packet.add("D" + buffer.getShort());
+                    break;
+                }
+                default: {
+                    packet.add(String.valueOf(code));
+                    break;
+                }
+            }
+        }
+        return packet.toArray(new String[0]);
+    }
+
+    /**
+     * Sends one response clause to the engine.
+     */
+    private void write(String code) throws IOException {
+        if (this.binaryOutStream != null) {
+            boolean raise = code.charAt(0) == 'R';
+            this.binaryOutStream.writeShort(raise ? 3 : 1);
+            this.binaryOutStream.writeByte(code.charAt(0));
+            if (raise) {
+                this.binaryOutStream.writeShort(Integer.parseInt(code.substring(1)));
+            }
+            this.binaryOutStream.flush();
+        } else {
+            this.outStream.println(code);
+        }
+    }
+
     /**
      * Encodes an action and sends it to the engine.
      */
-    public void send(Action action) {
+    public void send(Action action) throws IOException {
         String code;
         switch (action.actionType) {
             case FOLD_ACTION_TYPE: {
@@ -54,7 +152,7 @@ public class Runner {
                 break;
             }
         }
-        this.outStream.println(code);
+        this.write(code);
     }
 
     /**
@@ -69,6 +167,13 @@ public class Runner {
         boolean roundFlag = true;
         while (true) {
             String[] packet = this.receive();
+            if (packet.length == 1 && packet[0].equals(HELLO)) {
+                // the engine offers wire protocol v2: agree in text, then switch
+                this.write(HELLO);
+                this.binaryInStream = new DataInputStream(new BufferedInputStream(this.rawInStream));
+                this.binaryOutStream = new DataOutputStream(new BufferedOutputStream(this.rawOutStream));
+                continue;
+            }
             for (String clause : packet) {
                 String leftover = clause.substring(1, clause.length());
                 switch (clause.charAt(0)) {
@@ -168,6 +273,18 @@ public class Runner {
                         roundFlag = true;
                         break;
                     }
+                    case 'N': {
+                        // a new game in the same process: start a fresh bot, keeping whatever its classes already loaded
+                        try {
+                            this.pokerbot = this.pokerbot.getClass().getDeclaredConstructor().newInstance();
+                        } catch (ReflectiveOperationException e) {
+                            throw new IOException("Could not start a new " + this.pokerbot.getClass().getName());
+                        }
+                        gameState = new GameState(0, (float)0., 1);
+                        active = 0;
+                        roundFlag = true;
+                        break;
+                    }
                     case 'Q': {
                         return;
                     }
@@ -187,6 +304,7 @@ public class Runner {
 
     /**
      * Parses arguments corresponding to socket connection information.
+     * The port may also be unix:PATH for a Unix domain socket.
      */
     public void parseArgs(String[] rawArgs) {
         boolean hostFlag = false;
@@ -200,23 +318,48 @@ public class Runner {
                 this.host = arg;
                 hostFlag = false;
             } else {
-                this.port = Integer.parseInt(arg);
+                this.port = arg;
             }
         }
     }
 
+    /**
+     * Opens the socket connection to the engine and its streams.
+     */
+    private void connect() throws IOException {
+        if (this.port.startsWith("unix:")) {
+            // Unix domain sockets need Java 16, so look the address class up at runtime to still build on Java 8
+            SocketAddress address;
+            try {
+                address = (SocketAddress)Class.forName("java.net.UnixDomainSocketAddress")
+                    .getMethod("of", String.class).invoke(null, this.port.substring(5));
+            } catch (ReflectiveOperationException e) {
+                throw new IOException("Unix domain sockets need Java 16 or later");
+            }
+            SocketChannel channel = SocketChannel.open(address);
+            this.socket = channel;
+            this.rawOutStream = Channels.newOutputStream(channel);
+            this.rawInStream = Channels.newInputStream(channel);
+        } else {
+            Socket socket = new Socket(this.host, Integer.parseInt(this.port));
+            socket.setTcpNoDelay(true);
+            this.socket = socket;
+            this.rawOutStream = socket.getOutputStream();
+            this.rawInStream = socket.getInputStream();
+        }
+        this.outStream = new PrintWriter(this.rawOutStream, true);
+        this.inStream = new BufferedReader(new InputStreamReader(this.rawInStream));
+    }
+
     /**
      * Runs the pokerbot.
      */
     public void runBot(Bot pokerbot) {
         this.pokerbot = pokerbot;
         try {
-            this.socket = new Socket(this.host, this.port);
-            this.socket.setTcpNoDelay(true);
-            this.outStream = new PrintWriter(socket.getOutputStream(), true);
-            this.inStream = new BufferedReader(new InputStreamReader(socket.getInputStream()));
-        } catch (IOException e) {
-            System.out.println("Could not connect to " + host + ":" + Integer.toString(port));
+            this.connect();
+        } catch (IOException | NumberFormatException e) {
+            System.out.println("Could not connect to " + host + ":" + port);
             return;
         }
         try {
@@ -0,0 +1,124 @@
+'''
+Per-decision latency instrumentation for the engine.
+Every response is tagged with the player, street, legal action set and round number and streamed to a CSV file,
+while log-bucketed histograms keep running quantiles for each tag without storing the samples.
+'''
+import heapq
+import json
+import math
+import time
+
+STREET_NAMES = {0: 'preflop', 3: 'flop', 4: 'turn', 5: 'river', None: 'end'}  # None is the end of round ack
+QUANTILES = (0.5, 0.9, 0.99)
+SLOWEST = 20  # decisions listed individually in the summary
+
+
+class LatencyHistogram():
+    '''
+    Counts latencies in logarithmic buckets, buckets_per_decade to each factor of ten starting at lowest seconds,
+    so any quantile is known to within one bucket (about 26% at the default resolution).
+    '''
+
+    def __init__(self, lowest=1e-6, decades=9, buckets_per_decade=10):
+        self.lowest = lowest
+        self.buckets_per_decade = buckets_per_decade
+        self.counts = [0] * (decades * buckets_per_decade + 1)
+        self.count = 0
+        self.total = 0.
+        self.minimum = math.inf
+        self.maximum = 0.
+
+    def add(self, seconds):
+        '''
+        Counts one latency.
+        '''
+        bucket = 0
+        if seconds > self.lowest:
+            bucket = min(len(self.counts) - 1, int(math.log10(seconds / self.lowest) * self.buckets_per_decade) + 1)
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        self.minimum = min(self.minimum, seconds)
+        self.maximum = max(self.maximum, seconds)
+
+    def quantile(self, q):
+        '''
+        Returns an estimate of the q quantile: the geometric middle of the bucket holding it.
+        '''
+        if self.count == 0:
+            return 0.
+        rank = q * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count > 0:
+                break
+        if bucket == 0:
+            return self.minimum
+        estimate = self.lowest * 10 ** ((bucket - 0.5) / self.buckets_per_decade)
+        return min(self.maximum, max(self.minimum, estimate))
+
+    def summary(self):
+        '''
+        Returns the count, total, mean, extremes and QUANTILES as a dict.
+        '''
+        summary = {'count': self.count, 'total': self.total, 'mean': self.total / self.count if self.count else 0.,
+                   'min': self.minimum if self.count else 0., 'max': self.maximum}
+        summary.update({'p{:g}'.format(100 * q): self.quantile(q) for q in QUANTILES})
+        return summary
+
+
+class LatencyRecorder():
+    '''
+    Collects every decision's latency for one match and writes name.csv as it goes and name.json at the end.
+    '''
+
+    def __init__(self, name):
+        self.name = name
+        self.histograms = {}
+        self.slowest = []
+        self.csv_file = open(name + '.csv', 'w')
+        self.csv_file.write('round,player,street,legal,seconds\n')
+        self.start_time = time.perf_counter()
+
+    def record(self, round_num, player, street, legal, seconds):
+        '''
+        Adds one response. street is None for the end of round ack and legal is the legal action codes, like 'FCR'.
+        seconds is None when the pokerbot was not asked because it disconnected or ran out of time,
+        and then nothing is recorded.
+        '''
+        if seconds is None:
+            return
+        street = STREET_NAMES[street]
+        self.csv_file.write('{},{},{},{},{:.6f}\n'.format(round_num, player, street, legal, seconds))
+        for tag in ((player,), (player, street), (player, street, legal)):
+            if tag not in self.histograms:
+                self.histograms[tag] = LatencyHistogram()
+            self.histograms[tag].add(seconds)
+        decision = (seconds, round_num, player, street, legal)
+        if len(self.slowest) < SLOWEST:
+            heapq.heappush(self.slowest, decision)
+        elif decision > self.slowest[0]:
+            heapq.heapreplace(self.slowest, decision)
+
+    def close(self):
+        '''
+        Writes the summary: overall time split between the engine and each bot, the histograms for each player,
+        street and legal action set, and the slowest decisions. Returns the summary.
+        '''
+        self.csv_file.close()
+        elapsed = time.perf_counter() - self.start_time
+        players = sorted(tag[0] for tag in self.histograms if len(tag) == 1)
+        bot_time = {player: self.histograms[(player,)].total for player in players}
+        summary = {
+            'elapsed': elapsed,
+            'engine': elapsed - sum(bot_time.values()),
+            'bots': bot_time,
+            'histograms': [dict(zip(('player', 'street', 'legal'), tag), **histogram.summary())
+                           for tag, histogram in sorted(self.histograms.items())],
+            'slowest': [dict(zip(('seconds', 'round', 'player', 'street', 'legal'), decision))
+                        for decision in sorted(self.slowest, reverse=True)],
+        }
+        with open(self.name + '.json', 'w') as json_file:
+            json.dump(summary, json_file, indent=4)
+        return summary
@@ -0,0 +1,93 @@
+'''
+Wire protocol v2: the engine's clauses in compact binary frames.
+
+The engine offers v2 by sending a text message holding the single clause V2 once the pokerbot connects.
+A runner that speaks v2 answers V2 and both ends switch to binary frames for the rest of the connection.
+Older runners treat V2 as an unknown clause and ack it with K, so they stay on the text protocol.
+
+Every frame is a big endian uint16 payload length followed by the payload, a run of clauses.
+A clause is its ASCII letter followed by fixed-size arguments, all integers big endian:
+
+T uint32 game clock in milliseconds
+P uint8 player index
+H, U, O two uint8 cards
+B uint8 card count, then that many uint8 cards
+R uint16 raise amount
+D int16 bankroll delta
+F, C, K, N, Q no arguments
+
+Cards are 4 * rank + suit as in hand_history.py. The pokerbot answers with a frame holding one action clause.
+'''
+import functools
+import struct
+
+from hand_history import CARD_CODES
+
+HELLO = 'V2'
+FRAME = struct.Struct('!H')
+CLOCK = struct.Struct('!I')
+AMOUNT = struct.Struct('!H')
+DELTA = struct.Struct('!h')
+
+
+def encode_cards(cards):
+    '''
+    Encodes comma separated cards in common format as card codes.
+    '''
+    return bytes(CARD_CODES[card] for card in cards.split(','))
+
+
+@functools.lru_cache(maxsize=4096)
+def encode_clause(clause):
+    '''
+    Encodes one text clause as its binary form.
+    '''
+    code = clause[0]
+    if code == 'T':
+        return b'T' + CLOCK.pack(round(1000 * float(clause[1:])))
+    if code == 'P':
+        return b'P' + bytes((int(clause[1:]),))
+    if code in 'HUO':
+        return code.encode() + encode_cards(clause[1:])
+    if code == 'B':
+        cards = encode_cards(clause[1:])
+        return b'B' + bytes((len(cards),)) + cards
+    if code == 'R':
+        return b'R' + AMOUNT.pack(int(clause[1:]))
+    if code == 'D':
+        return b'D' + DELTA.pack(int(clause[1:]))
+    return code.encode()
+
+
+def encode_packet(packet):
+    '''
+    Encodes a message, a list of text clauses, as one frame.
+    '''
+    payload = b''.join(map(encode_clause, packet))
+    return FRAME.pack(len(payload)) + payload
+
+
+def read_frame(socketfile):
+    '''
+    Reads one frame's payload from a binary file object.
+    '''
+    header = socketfile.read(FRAME.size)
+    if len(header) < FRAME.size:
+        raise ConnectionError('connection closed')
+    length, = FRAME.unpack(header)
+    payload = socketfile.read(length)
+    if len(payload) < length:
+        raise ConnectionError('connection closed')
+    return payload
+
+
+def decode_response(payload):
+    '''
+    Decodes the pokerbot's response frame as a text action clause. Raises ValueError if it is malformed.
+    '''
+    code = payload[:1].decode()
+    if code == 'R' and len(payload) == 1 + AMOUNT.size:
+        return 'R' + str(AMOUNT.unpack_from(payload, 1)[0])
+    if code in ('F', 'C', 'K') and len(payload) == 1:
+        return code
+    raise ValueError('malformed response frame')
@@ -9,6 +9,8 @@ from skeleton.runner import parse_args, run_bot
 
 import eval7
 import random
+import math
+import time
 
 
 class Player(Bot):
@@ -27,13 +29,16 @@ class Player(Bot):
         Nothing.
         '''
     
-    def calc_strength(self, hole, iters):
+    def calc_strength(self, hole, budget):
         '''
-        A Monte carlo method that estimates the win probability of a pair of hole cards 
+        An anytime Monte carlo method that estimates the win probability of a pair of hole cards,
+        sampling until the time budget runs out
 
         Args:
         hole: list of 2 hole cards 
-        iters: number of times the sim is run
+        budget: number of seconds the sim may run for
+
+        Returns the win probability and the half width of its 95% confidence interval
         '''
 
         deck = eval7.Deck() #deck of cards
@@ -42,37 +47,67 @@ class Player(Bot):
         for card in hole_cards:
             deck.cards.remove(card)
 
+        _BATCH = 25 #samples between clock checks
+        _MIN_ITERS = 50 #always take at least this many samples
+
         score = 0
+        squares = 0 #sum of squared scores, for the confidence interval
+        iters = 0
+        deadline = time.perf_counter() + budget
 
-        for _ in range(iters):
-            deck.shuffle()
+        while iters < _MIN_ITERS or time.perf_counter() < deadline:
+            for _ in range(_BATCH):
+                deck.shuffle()
 
-            _COMM = 5 
-            _OPP = 2
+                _COMM = 5 
+                _OPP = 2
 
-            draw = deck.peek(_COMM+_OPP)
+                draw = deck.peek(_COMM+_OPP)
 
-            opp_hole = draw[:_OPP]
-            community = draw[_OPP:]
+                opp_hole = draw[:_OPP]
+                community = draw[_OPP:]
 
-            our_hand = hole_cards + community
-            opp_hand = opp_hole + community
+                our_hand = hole_cards + community
+                opp_hand = opp_hole + community
 
-            our_hand_value = eval7.evaluate(our_hand)
-            opp_hand_value = eval7.evaluate(opp_hand)
+                our_hand_value = eval7.evaluate(our_hand)
+                opp_hand_value = eval7.evaluate(opp_hand)
+
+                if our_hand_value > opp_hand_value:
+                    score += 2 
+                    squares += 4
+
+                elif our_hand_value == opp_hand_value:
+                    score += 1 
+                    squares += 1
+
+            iters += _BATCH
 
-            if our_hand_value > opp_hand_value:
-                score += 2 
-            
-            if our_hand_value == opp_hand_value:
-                score += 1 
-            
-            else:
-                score += 0
-        
         hand_strength = score/(2*iters)
+        variance = max(0, squares/(4*iters) - hand_strength**2)
+
+        return hand_strength, 1.96*math.sqrt(variance/iters)
+
+    def time_budget(self, game_state, street, pot_total):
+        '''
+        How many seconds we can spend on this decision. The clock left after a safety reserve is split
+        over the remaining rounds, weighted by street and scaled up when the pot is big
+
+        Args:
+        game_state: the GameState object
+        street: 0, 3, 4, or 5
+        pot_total: chips in the pot
+        '''
+
+        _RESERVE = 0.2 #fraction of the clock we never plan to use
+        _STREET_WEIGHTS = {0: 0.1, 3: 0.35, 4: 0.3, 5: 0.25} #share of a round's budget for one decision on each street
+        _TYPICAL_POT = 16 #pots this big get the plain budget
+
+        rounds_left = max(1, NUM_ROUNDS - game_state.round_num + 1)
+        per_round = game_state.game_clock * (1 - _RESERVE) / rounds_left
+        scale = min(4, max(0.25, pot_total / _TYPICAL_POT))
 
-        return hand_strength
+        return max(0, min(per_round * _STREET_WEIGHTS[street] * scale, game_state.game_clock / 10))
 
 
 
@@ -163,8 +198,8 @@ class Player(Bot):
         else:
             temp_action = FoldAction()
 
-        _MONTE_CARLO_ITERS = 100
-        strength = self.calc_strength(my_cards, _MONTE_CARLO_ITERS)
+        budget = self.time_budget(game_state, street, pot_total) #spend our clock where the pot is big
+        strength, _ = self.calc_strength(my_cards, budget)
 
         if continue_cost > 0:
             _SCARY = 0 
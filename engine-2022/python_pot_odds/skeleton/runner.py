@@ -3,112 +3,453 @@ The infrastructure for interacting with the engine.
 '''
 import argparse
 import socket
+import struct
 from .actions import FoldAction, CallAction, CheckAction, RaiseAction
 from .states import GameState, TerminalState, RoundState
 from .states import STARTING_STACK, BIG_BLIND, SMALL_BLIND, FLOP_PERCENT, TURN_PERCENT
 from .bot import Bot
 
+# wire protocol v2, offered by the engine with a HELLO message: big endian length prefixed frames of clauses
+# with integer arguments, and cards coded as 4 * rank + suit (see protocol.py in the engine)
+HELLO = 'V2'
+FRAME = struct.Struct('!H')
+CLOCK = struct.Struct('!I')
+AMOUNT = struct.Struct('!H')
+DELTA = struct.Struct('!h')
+CARDS = [rank + suit for rank in '23456789TJQKA' for suit in 'cdhs']
+
+
+def decode_packet(payload):
+    '''
+    Decodes one binary frame's payload into the clauses of the text protocol.
+    '''
+    packet = []
+    i = 0
+    while i < len(payload):
+        code = chr(payload[i])
+        i += 1
+        if code == 'T':
+            packet.append('T' + str(CLOCK.unpack_from(payload, i)[0] / 1000))
+            i += CLOCK.size
+        elif code == 'P':
+            packet.append('P' + str(payload[i]))
+            i += 1
+        elif code in 'HUO':
+            packet.append(code + CARDS[payload[i]] + ',' + CARDS[payload[i + 1]])
+            i += 2
+        elif code == 'B':
+            count = payload[i]
+            packet.append('B' + ','.join([CARDS[card] for card in payload[i + 1:i + 1 + count]]))
+            i += 1 + count
+        elif code == 'R':
+            packet.append('R' + str(AMOUNT.unpack_from(payload, i)[0]))
+            i += AMOUNT.size
+        elif code == 'D':
+            packet.append('D' + str(DELTA.unpack_from(payload, i)[0]))
+            i += DELTA.size
+        else:
+            packet.append(code)
+    return packet
+
+
+def encode_response(code):
+    '''
+    Encodes an action clause as one binary frame.
+    '''
+    payload = code[0].encode()
+    if code[0] == 'R':
+        payload += AMOUNT.pack(int(code[1:]))
+    return FRAME.pack(len(payload)) + payload
+
+
+def replay(clauses, active):
+    '''
+    Rebuilds the game tree of one round from its clauses, H first, with a new RoundState for every clause.
+    '''
+    round_state = None
+    for clause in clauses:
+        if clause[0] == 'H':
+            hands = [[], []]
+            hands[active] = clause[1:].split(',')
+            pips = [SMALL_BLIND, BIG_BLIND]
+            stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
+            round_state = RoundState(0, 0, pips, stacks, hands, [], None)
+        elif clause[0] == 'U':
+            hands = [[], []]
+            hands[active] = clause[1:].split(',')
+            round_state = RoundState(round_state.button, round_state.street, round_state.pips, round_state.stacks,
+                                     hands, round_state.deck, round_state.previous_state)
+        elif clause[0] == 'F':
+            round_state = round_state.proceed(FoldAction())
+        elif clause[0] == 'C':
+            round_state = round_state.proceed(CallAction())
+        elif clause[0] == 'K':
+            round_state = round_state.proceed(CheckAction())
+        elif clause[0] == 'R':
+            round_state = round_state.proceed(RaiseAction(int(clause[1:])))
+        elif clause[0] == 'B':
+            round_state = RoundState(round_state.button, round_state.street, round_state.pips, round_state.stacks,
+                                     round_state.hands, clause[1:].split(','), round_state.previous_state)
+        elif clause[0] == 'O':
+            # backtrack
+            round_state = round_state.previous_state
+            revised_hands = list(round_state.hands)
+            revised_hands[1-active] = clause[1:].split(',')
+            # rebuild history
+            round_state = RoundState(round_state.button, round_state.street, round_state.pips, round_state.stacks,
+                                     revised_hands, round_state.deck, round_state.previous_state)
+            round_state = TerminalState([0, 0], round_state)
+    return round_state
+
+
+class History():
+    '''
+    The first length clauses of a round, replayed into the chain of earlier RoundStates the first time it is needed.
+    '''
+    __slots__ = ('clauses', 'length', 'active', 'round_state')
+
+    def __init__(self, clauses, length, active):
+        self.clauses = clauses
+        self.length = length
+        self.active = active
+        self.round_state = None
+
+    def previous_state(self):
+        '''
+        Returns the state before the last of the clauses.
+        '''
+        if self.round_state is None:
+            self.round_state = replay(self.clauses[:self.length], self.active)
+        round_state = self.round_state
+        if isinstance(round_state, TerminalState):
+            round_state = round_state.previous_state
+        return round_state.previous_state
+
+
+class RoundStateView(RoundState):
+    '''
+    The RoundState handed to the bot. Its fields are a snapshot of the Runner's state for the round,
+    and its previous_state is only rebuilt when the bot first needs it.
+    The tuple itself holds None in place of previous_state, so everything that reads the tuple as a whole
+    (indexing, unpacking, comparing, hashing, pickling) goes through the rebuilt RoundState instead.
+    '''
+
+    def __new__(cls, button, street, pips, stacks, hands, deck, history):
+        view = super().__new__(cls, button, street, pips, stacks, hands, deck, None)
+        view._history = history
+        view._round_state = None
+        return view
+
+    @property
+    def previous_state(self):
+        '''
+        The game tree before the last action.
+        '''
+        return self._state().previous_state
+
+    def _state(self):
+        '''
+        Returns the view as a plain RoundState, rebuilding its previous_state the first time.
+        '''
+        if self._round_state is None:
+            previous_state = self._history.previous_state() if self._history is not None else None
+            self._round_state = RoundState(*tuple.__getitem__(self, slice(6)), previous_state)
+        return self._round_state
+
+    def __getitem__(self, index):
+        return self._state()[index]
+
+    def __iter__(self):
+        return iter(self._state())
+
+    def __contains__(self, value):
+        return value in self._state()
+
+    def count(self, value):
+        return self._state().count(value)
+
+    def index(self, *args):
+        return self._state().index(*args)
+
+    def __eq__(self, other):
+        return self._state() == (other._state() if isinstance(other, RoundStateView) else other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._state())
+
+    def __reduce__(self):
+        return self._state().__reduce__()
+
+    def _asdict(self):
+        return self._state()._asdict()
+
+    def _replace(self, **changes):
+        return self._state()._replace(**changes)
+
+    def __repr__(self):
+        return repr(self._state())
+
 
 class Runner():
     '''
     Interacts with the engine.
+    The round is kept in mutable fields, updated in place by one handler per clause type,
+    and the bot gets a RoundStateView of them whenever it is called.
     '''
+    HANDLERS = {'T': 'handle_clock', 'P': 'handle_seat', 'H': 'handle_hand', 'U': 'handle_swap',
+                'F': 'handle_fold', 'C': 'handle_call', 'K': 'handle_check', 'R': 'handle_raise',
+                'B': 'handle_board', 'O': 'handle_reveal', 'D': 'handle_delta', 'N': 'handle_new_game'}
 
     def __init__(self, pokerbot, socketfile):
         self.pokerbot = pokerbot
         self.socketfile = socketfile
+        self.handlers = {code: getattr(self, name) for code, name in self.HANDLERS.items()}
+        self.bankroll = 0
+        self.game_clock = 0.
+        self.round_num = 1
+        self.active = 0
+        self.round_flag = True
+        self.binary = False
+        # the current round
+        self.button = 0
+        self.street = 0
+        self.pips = [0, 0]
+        self.stacks = [0, 0]
+        self.hands = [[], []]
+        self.deck = []
+        self.deltas = None  # set once the round is over
+        self.clauses = []  # the round's clauses so far, for rebuilding its history
 
     def receive(self):
         '''
         Generator for incoming messages from the engine.
         '''
         while True:
-            packet = self.socketfile.readline().strip().split(' ')
+            if self.binary:
+                header = self.socketfile.read(FRAME.size)
+                if len(header) < FRAME.size:
+                    break
+                packet = decode_packet(self.socketfile.read(FRAME.unpack(header)[0]))
+            else:
+                packet = self.socketfile.readline().decode().strip().split(' ')
             if not packet:
                 break
             yield packet
 
+    def encode(self, action):
+        '''
+        Encodes an action in the engine's format.
+        '''
+        if isinstance(action, FoldAction):
+            return 'F'
+        if isinstance(action, CallAction):
+            return 'C'
+        if isinstance(action, CheckAction):
+            return 'K'
+        # isinstance(action, RaiseAction)
+        return 'R' + str(action.amount)
+
     def send(self, action):
         '''
         Encodes an action and sends it to the engine.
         '''
-        if isinstance(action, FoldAction):
-            code = 'F'
-        elif isinstance(action, CallAction):
-            code = 'C'
-        elif isinstance(action, CheckAction):
-            code = 'K'
-        else:  # isinstance(action, RaiseAction)
-            code = 'R' + str(action.amount)
-        self.socketfile.write(code + '\n')
+        self.write(self.encode(action))
+
+    def write(self, code):
+        '''
+        Sends one response clause to the engine.
+        '''
+        self.socketfile.write(encode_response(code) if self.binary else (code + '\n').encode())
         self.socketfile.flush()
 
+    def game_state(self):
+        '''
+        Returns the GameState for the bot.
+        '''
+        return GameState(self.bankroll, self.game_clock, self.round_num)
+
+    def round_state(self):
+        '''
+        Returns a RoundStateView of the current round for the bot.
+        '''
+        return RoundStateView(self.button, self.street, list(self.pips), list(self.stacks), self.hands, self.deck,
+                              History(self.clauses, len(self.clauses), self.active))
+
+    def handle_clock(self, clause):
+        '''
+        T: the game clock.
+        '''
+        self.game_clock = float(clause[1:])
+
+    def handle_seat(self, clause):
+        '''
+        P: the player's index.
+        '''
+        self.active = int(clause[1:])
+
+    def handle_hand(self, clause):
+        '''
+        H: the player's hand, which starts a new round with the blinds posted.
+        '''
+        hands = [[], []]
+        hands[self.active] = [clause[1:3], clause[4:6]]
+        self.button = 0
+        self.street = 0
+        self.pips = [SMALL_BLIND, BIG_BLIND]
+        self.stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
+        self.hands = hands
+        self.deck = []
+        self.deltas = None
+        self.clauses = [clause]
+        if self.round_flag:
+            self.pokerbot.handle_new_round(self.game_state(), self.round_state(), self.active)
+            self.round_flag = False
+
+    def handle_swap(self, clause):
+        '''
+        U: the player's hand after a swap.
+        '''
+        self.clauses.append(clause)
+        hands = [[], []]
+        hands[self.active] = [clause[1:3], clause[4:6]]
+        self.hands = hands
+
+    def handle_fold(self, clause):
+        '''
+        F: the active player folds and the round is over.
+        '''
+        self.clauses.append(clause)
+        if self.button % 2 == 0:
+            delta = self.stacks[0] - STARTING_STACK
+        else:
+            delta = STARTING_STACK - self.stacks[1]
+        self.deltas = [delta, -delta]
+
+    def handle_call(self, clause):
+        '''
+        C: the active player calls.
+        '''
+        self.clauses.append(clause)
+        if self.button == 0:  # sb calls bb
+            self.button = 1
+            self.pips = [BIG_BLIND] * 2
+            self.stacks = [STARTING_STACK - BIG_BLIND] * 2
+            return
+        # both players acted
+        active = self.button % 2
+        contribution = self.pips[1-active] - self.pips[active]
+        self.stacks[active] -= contribution
+        self.pips[active] += contribution
+        self.button += 1
+        self.proceed_street()
+
+    def handle_check(self, clause):
+        '''
+        K: the active player checks.
+        '''
+        self.clauses.append(clause)
+        if (self.street == 0 and self.button > 0) or self.button > 1:  # both players acted
+            self.proceed_street()
+        else:  # let opponent act
+            self.button += 1
+
+    def handle_raise(self, clause):
+        '''
+        R: the active player bets or raises to an amount.
+        '''
+        self.clauses.append(clause)
+        active = self.button % 2
+        amount = int(clause[1:])
+        self.stacks[active] -= amount - self.pips[active]
+        self.pips[active] = amount
+        self.button += 1
+
+    def proceed_street(self):
+        '''
+        Resets the pips for the next round of betting, or ends the round in a showdown after the river.
+        '''
+        if self.street == 5:
+            self.deltas = [0, 0]
+            return
+        self.button = 1
+        self.street = 3 if self.street == 0 else self.street + 1
+        self.pips = [0, 0]
+
+    def handle_board(self, clause):
+        '''
+        B: the board cards.
+        '''
+        self.clauses.append(clause)
+        self.deck = clause[1:].split(',')
+
+    def handle_reveal(self, clause):
+        '''
+        O: the opponent's hand at showdown.
+        '''
+        self.clauses.append(clause)
+        hands = list(self.hands)
+        hands[1-self.active] = [clause[1:3], clause[4:6]]
+        self.hands = hands
+
+    def handle_delta(self, clause):
+        '''
+        D: the player's bankroll delta, which ends the round.
+        '''
+        assert self.deltas is not None
+        delta = int(clause[1:])
+        deltas = [-delta, -delta]
+        deltas[self.active] = delta
+        self.bankroll += delta
+        terminal_state = TerminalState(deltas, self.round_state())
+        self.pokerbot.handle_round_over(self.game_state(), terminal_state, self.active)
+        self.round_num += 1
+        self.round_flag = True
+
+    def handle_new_game(self, clause):
+        '''
+        N: a new game in the same process: start a fresh bot, keeping whatever its module already loaded.
+        '''
+        self.pokerbot = type(self.pokerbot)()
+        self.bankroll = 0
+        self.game_clock = 0.
+        self.round_num = 1
+        self.active = 0
+        self.round_flag = True
+
+    def respond(self, packet):
+        '''
+        Applies one message from the engine to the round.
+        Returns the action to send back, or None once the engine ends the game.
+        '''
+        handlers = self.handlers
+        for clause in packet:
+            code = clause[0]
+            if code == 'Q':
+                return None
+            handler = handlers.get(code)
+            if handler is not None:
+                handler(clause)
+        if self.round_flag:  # ack the engine
+            return CheckAction()
+        assert self.active == self.button % 2
+        return self.pokerbot.get_action(self.game_state(), self.round_state(), self.active)
+
     def run(self):
         '''
         Reconstructs the game tree based on the action history received from the engine.
         '''
-        game_state = GameState(0, 0., 1)
-        round_state = None
-        active = 0
-        round_flag = True
         for packet in self.receive():
-            for clause in packet:
-                if clause[0] == 'T':
-                    game_state = GameState(game_state.bankroll, float(clause[1:]), game_state.round_num)
-                elif clause[0] == 'P':
-                    active = int(clause[1:])
-                elif clause[0] == 'H':
-                    hands = [[], []]
-                    hands[active] = clause[1:].split(',')
-                    pips = [SMALL_BLIND, BIG_BLIND]
-                    stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
-                    round_state = RoundState(0, 0, pips, stacks, hands, [], None)
-                    if round_flag:
-                        self.pokerbot.handle_new_round(game_state, round_state, active)
-                        round_flag = False
-                elif clause[0] == 'U':
-                    hands = [[], []]
-                    hands[active] = clause[1:].split(',')
-                    round_state = RoundState(round_state.button, round_state.street, round_state.pips, round_state.stacks,
-                                             hands, round_state.deck, round_state.previous_state)
-                elif clause[0] == 'F':
-                    round_state = round_state.proceed(FoldAction())
-                elif clause[0] == 'C':
-                    round_state = round_state.proceed(CallAction())
-                elif clause[0] == 'K':
-                    round_state = round_state.proceed(CheckAction())
-                elif clause[0] == 'R':
-                    round_state = round_state.proceed(RaiseAction(int(clause[1:])))
-                elif clause[0] == 'B':
-                    round_state = RoundState(round_state.button, round_state.street, round_state.pips, round_state.stacks,
-                                             round_state.hands, clause[1:].split(','), round_state.previous_state)
-                elif clause[0] == 'O':
-                    # backtrack
-                    round_state = round_state.previous_state
-                    revised_hands = list(round_state.hands)
-                    revised_hands[1-active] = clause[1:].split(',')
-                    # rebuild history
-                    round_state = RoundState(round_state.button, round_state.street, round_state.pips, round_state.stacks,
-                                             revised_hands, round_state.deck, round_state.previous_state)
-                    round_state = TerminalState([0, 0], round_state)
-                elif clause[0] == 'D':
-                    assert isinstance(round_state, TerminalState)
-                    delta = int(clause[1:])
-                    deltas = [-delta, -delta]
-                    deltas[active] = delta
-                    round_state = TerminalState(deltas, round_state.previous_state)
-                    game_state = GameState(game_state.bankroll + delta, game_state.game_clock, game_state.round_num)
-                    self.pokerbot.handle_round_over(game_state, round_state, active)
-                    game_state = GameState(game_state.bankroll, game_state.game_clock, game_state.round_num + 1)
-                    round_flag = True
-                elif clause[0] == 'Q':
-                    return
-            if round_flag:  # ack the engine
-                self.send(CheckAction())
-            else:
-                assert active == round_state.button % 2
-                action = self.pokerbot.get_action(game_state, round_state, active)
-                self.send(action)
+            if packet == [HELLO]:  # the engine offers wire protocol v2: agree in text, then switch
+                self.write(HELLO)
+                self.binary = True
+                continue
+            action = self.respond(packet)
+            if action is None:
+                return
+            self.send(action)
 
 
 def parse_args():
@@ -117,20 +458,38 @@ def parse_args():
     '''
     parser = argparse.ArgumentParser(prog='python3 player.py')
     parser.add_argument('--host', type=str, default='localhost', help='Host to connect to, defaults to localhost')
-    parser.add_argument('port', type=int, help='Port on host to connect to')
+    parser.add_argument('port', type=str,
+                        help='Port on host to connect to, unix:PATH for a Unix domain socket or fd:N for an inherited socket')
     return parser.parse_args()
 
+def connect(args):
+    '''
+    Opens the socket connection to the engine.
+    '''
+    if args.port.startswith('unix:'):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(args.port[5:])
+    elif args.port.startswith('fd:'):
+        sock = socket.socket(fileno=int(args.port[3:]))
+    else:
+        sock = socket.create_connection((args.host, int(args.port)))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
 def run_bot(pokerbot, args):
     '''
     Runs the pokerbot.
     '''
     assert isinstance(pokerbot, Bot)
     try:
-        sock = socket.create_connection((args.host, args.port))
-    except OSError:
+        sock = connect(args)
+    except (OSError, ValueError):
         print('Could not connect to {}:{}'.format(args.host, args.port))
         return
-    socketfile = sock.makefile('rw')
+    socketfile = sock.makefile('rwb')
+    if args.port.startswith('fd:'):  # tell the engine we are ready, as there was no connection for it to wait on
+        socketfile.write(b'K\n')
+        socketfile.flush()
     runner = Runner(pokerbot, socketfile)
     runner.run()
     socketfile.close()
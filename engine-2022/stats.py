@@ -0,0 +1,76 @@
+'''
+Streaming statistics for comparing pokerbots.
+'''
+import math
+
+
+class RunningStats():
+    '''
+    The count, mean and variance of a stream of samples, updated with Welford's method,
+    so no samples are kept and the variance stays accurate over long streams.
+    '''
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.
+        self.m2 = 0.  # sum of squared deviations from the running mean
+
+    def add(self, sample):
+        '''
+        Adds one sample.
+        '''
+        self.count += 1
+        delta = sample - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (sample - self.mean)
+
+    def variance(self):
+        '''
+        Returns the sample variance, or nan with fewer than two samples.
+        '''
+        return self.m2 / (self.count - 1) if self.count > 1 else float('nan')
+
+    def stderr(self):
+        '''
+        Returns the standard error of the mean, or nan with fewer than two samples.
+        '''
+        return math.sqrt(self.variance() / self.count) if self.count > 1 else float('nan')
+
+
+class SequentialTest():
+    '''
+    A sequential probability ratio test on the mean of a stream of results, taken as normal with the variance
+    estimated as the stream goes. It weighs a mean of threshold + margin against threshold - margin
+    and decides as soon as the log likelihood ratio crosses the bound for error rates alpha and beta.
+    '''
+
+    def __init__(self, threshold=0., margin=1., alpha=0.05, beta=0.05, min_samples=100):
+        self.threshold = threshold
+        self.margin = margin
+        self.upper = math.log((1 - beta) / alpha)
+        self.lower = math.log(beta / (1 - alpha))
+        self.min_samples = min_samples  # the variance estimate is too rough to trust before this
+        self.stats = RunningStats()
+        self.decision = None
+
+    def log_likelihood_ratio(self):
+        '''
+        Returns the evidence for the mean being above the threshold rather than below.
+        '''
+        variance = self.stats.variance()
+        if not variance > 0.:
+            return 0.
+        return 2 * self.margin * self.stats.count * (self.stats.mean - self.threshold) / variance
+
+    def add(self, sample):
+        '''
+        Adds one result. Returns 'above' or 'below' once the test has decided, otherwise None.
+        '''
+        self.stats.add(sample)
+        if self.decision is None and self.stats.count >= self.min_samples:
+            ratio = self.log_likelihood_ratio()
+            if ratio >= self.upper:
+                self.decision = 'above'
+            elif ratio <= self.lower:
+                self.decision = 'below'
+        return self.decision
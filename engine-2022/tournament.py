@@ -0,0 +1,197 @@
+'''
+Plays many engine matches between a set of pokerbots over a process pool.
+'''
+from collections import namedtuple
+import multiprocessing
+import multiprocessing.util
+import contextlib
+import itertools
+import argparse
+import random
+import json
+import sys
+import os
+
+sys.path.append(os.getcwd())
+from config import *
+from engine import Game, BotPool
+from stats import RunningStats
+
+Match = namedtuple('Match', ['match_id', 'names', 'paths', 'seed', 'num_rounds', 'log_dir', 'headless', 'log_level'])
+Result = namedtuple('Result', ['match', 'bankrolls'])
+WORKER_POOL = None  # the pool worker's running pokerbots, reused between the matches it plays
+
+
+def bot_names(paths):
+    '''
+    Names each pokerbot after its directory, numbering any duplicates.
+    '''
+    names = [os.path.basename(os.path.normpath(path)) for path in paths]
+    return [name if names.count(name) == 1 else '{}-{}'.format(name, i + 1) for i, name in enumerate(names)]
+
+
+def schedule(paths, mode, games, seed, num_rounds, log_dir, headless, log_level=GAME_LOG_LEVEL, duplicate=False):
+    '''
+    Returns the list of matches to play.
+    In round-robin mode every pair of bots meets; in head-to-head mode the first bot meets each of the others.
+    Every pairing is played games times with fresh seeds, alternating which bot is seated first.
+    In duplicate mode each of those games is followed by its mirror: the same seed with the seats exchanged.
+    '''
+    names = bot_names(paths)
+    paths = [os.path.abspath(path) for path in paths]
+    if mode == 'round-robin':
+        pairings = list(itertools.combinations(range(len(paths)), 2))
+    else:  # mode == 'head-to-head'
+        pairings = [(0, j) for j in range(1, len(paths))]
+    matches = []
+    deals = 0
+    for i, j in pairings:
+        for game in range(games):
+            order = (i, j) if game % 2 == 0 else (j, i)
+            for seats in ((order, order[::-1]) if duplicate else (order,)):
+                match_id = '{:04d}-{}-vs-{}'.format(len(matches), names[seats[0]], names[seats[1]])
+                matches.append(Match(match_id, tuple(names[k] for k in seats), tuple(paths[k] for k in seats),
+                                     seed + deals, num_rounds, os.path.join(log_dir, match_id), headless, log_level))
+            deals += 1
+    return matches
+
+
+def start_worker(headless):
+    '''
+    Gives a pool worker its own BotPool, which stops the pokerbots when the worker exits.
+    '''
+    global WORKER_POOL  # pylint: disable=global-statement
+    WORKER_POOL = BotPool(headless)
+    multiprocessing.util.Finalize(WORKER_POOL, WORKER_POOL.close, exitpriority=10)
+
+
+def play(match):
+    '''
+    Plays one match in a pool worker. Engine output goes to the match's log directory.
+    '''
+    os.makedirs(match.log_dir, exist_ok=True)
+    random.seed(match.seed)
+    with open(os.path.join(match.log_dir, 'engine.txt'), 'w') as engine_output:
+        with contextlib.redirect_stdout(engine_output):
+            game = Game(match.names, match.paths, match.num_rounds, match.log_dir, match.headless, match.log_level,
+                        pool=WORKER_POOL, seed=match.seed)
+            bankrolls = game.run()
+    return Result(match, bankrolls)
+
+
+def report(names, results):
+    '''
+    Merges match results into overall standings and per-pairing statistics.
+    Matches dealt from the same seed with the seats exchanged are also scored as duplicates: a bot's score for the deal
+    is its bankroll summed over both seats, so the luck of the cards cancels out.
+    '''
+    standings = {name: {'bankroll': 0, 'matches': 0, 'wins': 0, 'losses': 0} for name in names}
+    pairings = {}
+    deals = {}
+    for result in results:
+        for name, bankroll, opponent_bankroll in zip(result.match.names, result.bankrolls, result.bankrolls[::-1]):
+            standing = standings[name]
+            standing['bankroll'] += bankroll
+            standing['matches'] += 1
+            standing['wins'] += bankroll > opponent_bankroll
+            standing['losses'] += bankroll < opponent_bankroll
+        # pairings are keyed in schedule order so each one collects samples for the same bot
+        first, second = sorted(result.match.names, key=names.index)
+        bankroll = result.bankrolls[result.match.names.index(first)]
+        pairings.setdefault((first, second), RunningStats()).add(bankroll)
+        deals.setdefault((first, second, result.match.seed), []).append(bankroll)
+    duplicates = {}
+    for (first, second, _), bankrolls in sorted(deals.items()):
+        if len(bankrolls) == 2:
+            duplicates.setdefault((first, second), RunningStats()).add(sum(bankrolls))
+    return {
+        'standings': standings,
+        'pairings': [
+            dict(zip(('bot', 'opponent', 'matches', 'mean_bankroll', 'stderr'),
+                     (first, second, stats.count, stats.mean, stats.stderr())))
+            for (first, second), stats in sorted(pairings.items())
+        ],
+        'duplicates': [
+            dict(zip(('bot', 'opponent', 'deals', 'mean_score', 'stderr'),
+                     (first, second, stats.count, stats.mean, stats.stderr())))
+            for (first, second), stats in sorted(duplicates.items())
+        ]
+    }
+
+
+def print_report(summary):
+    '''
+    Prints the standings and pairings tables.
+    '''
+    print('{:<24}{:>12}{:>9}{:>7}{:>8}'.format('Bot', 'Bankroll', 'Matches', 'Wins', 'Losses'))
+    for name, standing in sorted(summary['standings'].items(), key=lambda item: -item[1]['bankroll']):
+        print('{:<24}{:>12}{:>9}{:>7}{:>8}'.format(name, standing['bankroll'], standing['matches'],
+                                                   standing['wins'], standing['losses']))
+    print()
+    print('{:<24}{:<24}{:>9}{:>12}{:>10}'.format('Bot', 'Opponent', 'Matches', 'Mean', 'Stderr'))
+    for pairing in summary['pairings']:
+        print('{:<24}{:<24}{:>9}{:>12.1f}{:>10.1f}'.format(pairing['bot'], pairing['opponent'], pairing['matches'],
+                                                           pairing['mean_bankroll'], pairing['stderr']))
+    if summary['duplicates']:
+        print()
+        print('{:<24}{:<24}{:>9}{:>12}{:>10}'.format('Bot', 'Opponent', 'Deals', 'Duplicate', 'Stderr'))
+        for duplicate in summary['duplicates']:
+            print('{:<24}{:<24}{:>9}{:>12.1f}{:>10.1f}'.format(duplicate['bot'], duplicate['opponent'],
+                                                               duplicate['deals'], duplicate['mean_score'],
+                                                               duplicate['stderr']))
+
+
+def parse_args():
+    '''
+    Parses the tournament's command line arguments.
+    '''
+    parser = argparse.ArgumentParser(prog='python3 tournament.py')
+    parser.add_argument('paths', nargs='+', help='Pokerbot directories, each containing a commands.json')
+    parser.add_argument('--mode', choices=['round-robin', 'head-to-head'], default='round-robin',
+                        help='Pair every bot with every other, or the first bot with each of the others')
+    parser.add_argument('--games', type=int, default=2, help='Matches per pairing, defaults to 2')
+    parser.add_argument('--rounds', type=int, default=NUM_ROUNDS, help='Rounds per match, defaults to NUM_ROUNDS')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the first match, defaults to 0')
+    parser.add_argument('--duplicate', action='store_true',
+                        help='Replay every deal with the seats exchanged and report the paired scores')
+    parser.add_argument('--processes', type=int, default=os.cpu_count(),
+                        help='Matches to play at once, defaults to the number of cores')
+    parser.add_argument('--log-dir', type=str, default='tournament', help='Directory for match logs and the report')
+    parser.add_argument('--headless', action='store_true', default=HEADLESS,
+                        help='Run Python bots inside the engine process, defaults to HEADLESS')
+    parser.add_argument('--log-level', choices=['off', 'summary', 'full'], default=GAME_LOG_LEVEL,
+                        help='How much of each match to write to its game log, defaults to GAME_LOG_LEVEL')
+    return parser.parse_args()
+
+
+def main():
+    '''
+    Schedules the tournament, plays it over a process pool and writes the merged report.
+    '''
+    args = parse_args()
+    if len(args.paths) < 2:
+        print('A tournament needs at least two bots')
+        return
+    matches = schedule(args.paths, args.mode, args.games, args.seed, args.rounds, args.log_dir, args.headless,
+                       args.log_level, args.duplicate)
+    print('Playing', len(matches), 'matches on', args.processes, 'processes')
+    results = []
+    with multiprocessing.Pool(args.processes, start_worker, (args.headless,)) as pool:
+        for result in pool.imap_unordered(play, matches):
+            results.append(result)
+            print('[{}/{}] {}: {}'.format(len(results), len(matches), result.match.match_id, result.bankrolls))
+        # let the workers exit on their own so they stop their pokerbots
+        pool.close()
+        pool.join()
+    summary = report(bot_names(args.paths), results)
+    print()
+    print_report(summary)
+    name = os.path.join(args.log_dir, 'report.json')
+    with open(name, 'w') as report_file:
+        json.dump(summary, report_file, indent=4)
+    print()
+    print('Writing', name)
+
+
+if __name__ == '__main__':
+    main()